@@ -5,11 +5,13 @@ Application configuration settings.
 
 Centralised configuration using Pydantic v2 (pydantic-settings). All values
 are validated and available both through the `settings` object and as
-module-level constants for convenient imports.
+module-level constants for convenient imports. Both are resolved lazily, so
+the environment is only read when a setting is first accessed.
 """
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, AnyHttpUrl
@@ -135,35 +137,24 @@ class Settings(BaseSettings):
     )
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def _get_settings() -> Settings:
+    """Build the `Settings` instance on first use and reuse it afterwards."""
+    return Settings()
 
-DATABASE_DSN = settings.DATABASE_DSN
 
-JWT_SECRET = settings.JWT_SECRET
-JWT_ALGORITHM = settings.JWT_ALGORITHM
-ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
-TOKEN_EXPIRE_MINUTES = settings.TOKEN_EXPIRE_MINUTES
+def __getattr__(name: str):
+    """Resolve `settings` and module-level constants lazily (PEP 562).
 
-GROQ_API_KEY = settings.GROQ_API_KEY
-GROQ_API_BASE = settings.GROQ_API_BASE
-GROQ_MODEL = settings.GROQ_MODEL
+    `from app.config import JWT_SECRET` keeps working, but the environment is
+    only parsed the first time any setting is actually accessed.
+    """
+    if name == "settings":
+        return _get_settings()
+    if name in Settings.model_fields:
+        return getattr(_get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-OPENAI_API_KEY = settings.OPENAI_API_KEY
-VOYAGE_API_KEY = settings.VOYAGE_API_KEY
-RETRIEVAL_MIN_SCORE = settings.RETRIEVAL_MIN_SCORE
 
-UPLOAD_DIR = settings.UPLOAD_DIR
-DATA_DIR = settings.DATA_DIR
-
-EMBEDDINGS_INDEX = settings.EMBEDDINGS_INDEX
-VOYAGE_EMBED_MODEL = settings.VOYAGE_EMBED_MODEL
-VOYAGE_RERANK_MODEL = settings.VOYAGE_RERANK_MODEL
-
-MODEL_CONTEXT_TOKENS = settings.MODEL_CONTEXT_TOKENS
-TOKENS_PER_CHAR = settings.TOKENS_PER_CHAR
-HISTORY_BUDGET_FRACTION = settings.HISTORY_BUDGET_FRACTION
-SAFETY_MARGIN_TOKENS = settings.SAFETY_MARGIN_TOKENS
-MAX_HISTORY_TOKENS = settings.MAX_HISTORY_TOKENS
-
-CHUNK_MAX_CHARS = settings.CHUNK_MAX_CHARS
-CHUNK_OVERLAP = settings.CHUNK_OVERLAP
\ No newline at end of file
+def __dir__() -> list[str]:
+    return sorted([*globals(), "settings", *Settings.model_fields])
@@ -1,13 +1,63 @@
 # app/crud_base.py
 
 from __future__ import annotations
-from typing import Any, Dict, Iterable, Optional, Sequence
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from app.db import fetch_all, fetch_one, execute
 
+
+@lru_cache(maxsize=512)
+def _list_sql(table: str, filter_keys: Tuple[str, ...]) -> str:
+    base = f'SELECT * FROM "{table}"'
+    if filter_keys:
+        where = " AND ".join(f'"{k}" = %({k})s' for k in filter_keys)
+        base += f" WHERE {where}"
+    return base
+
+
+@lru_cache(maxsize=512)
+def _get_sql(table: str, id_column: str) -> str:
+    return f'SELECT * FROM "{table}" WHERE "{id_column}" = %(id)s LIMIT 1'
+
+
+@lru_cache(maxsize=512)
+def _insert_sql(table: str, keys: Tuple[str, ...]) -> str:
+    cols = ", ".join(f'"{k}"' for k in keys)
+    vals = ", ".join(f"%({k})s" for k in keys)
+    return f'INSERT INTO "{table}" ({cols}) VALUES ({vals}) RETURNING *'
+
+
+@lru_cache(maxsize=512)
+def _bulk_insert_sql(table: str, keys: Tuple[str, ...], n_rows: int) -> str:
+    cols = ", ".join(f'"{k}"' for k in keys)
+    rows = ", ".join(
+        "(" + ", ".join(f"%(r{i}c{j})s" for j in range(len(keys))) + ")" for i in range(n_rows)
+    )
+    return f'INSERT INTO "{table}" ({cols}) VALUES {rows} RETURNING *'
+
+
+# Postgres caps bind parameters per statement at 65535.
+_MAX_BIND_PARAMS = 65535
+_BULK_MAX_ROWS = 1000
+
+
+@lru_cache(maxsize=512)
+def _update_sql(table: str, id_column: str, keys: Tuple[str, ...]) -> str:
+    set_clause = ", ".join(f'"{k}" = %({k})s' for k in keys)
+    return f'UPDATE "{table}" SET {set_clause} WHERE "{id_column}" = %(id)s RETURNING *'
+
+
+@lru_cache(maxsize=512)
+def _delete_sql(table: str, id_column: str) -> str:
+    return f'DELETE FROM "{table}" WHERE "{id_column}" = %(id)s'
+
+
 class CRUDBase:
     """
     Minimal repository with parameterized queries.
     NOTE: table/id_column must come from trusted code, not user input.
+    SQL text is cached per (table, columns) and sent as a server-side
+    prepared statement so Postgres can reuse the plan.
     """
 
     def __init__(self, table: str, id_column: str = "id", allowed_columns: Optional[Iterable[str]] = None) -> None:
@@ -21,18 +71,15 @@ class CRUDBase:
         return {k: v for k, v in data.items() if k in self.allowed}
 
     async def list(self, filters: Optional[Dict[str, Any]] = None) -> Sequence[Dict[str, Any]]:
-        base = f'SELECT * FROM "{self.table}"'
-        params: Dict[str, Any] = {}
-        if filters:
-            where = " AND ".join(f'"{k}" = %({k})s' for k in filters)
-            base += f" WHERE {where}"
-            params.update(filters)
-        return await fetch_all(base, params)
+        params: Dict[str, Any] = dict(filters or {})
+        query = _list_sql(self.table, tuple(sorted(params)))
+        return await fetch_all(query, params, prepare=True)
 
     async def get(self, item_id: Any) -> Dict[str, Any]:
         row = await fetch_one(
-            f'SELECT * FROM "{self.table}" WHERE "{self.id_column}" = %(id)s LIMIT 1',
+            _get_sql(self.table, self.id_column),
             {"id": item_id},
+            prepare=True,
         )
         if not row:
             raise KeyError(f"{self.table} not found")
@@ -44,11 +91,30 @@ class CRUDBase:
         data = self._filter_allowed(data)
         if not data:
             raise ValueError("No allowed fields to insert")
-        keys = list(data.keys())
-        cols = ", ".join(f'"{k}"' for k in keys)
-        vals = ", ".join(f"%({k})s" for k in keys)
-        query = f'INSERT INTO "{self.table}" ({cols}) VALUES ({vals}) RETURNING *'
-        return await fetch_one(query, data)
+        query = _insert_sql(self.table, tuple(sorted(data)))
+        return await fetch_one(query, data, prepare=True)
+
+    async def bulk_create(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert many rows with one multi-row INSERT per column set (batched to
+        stay under the bind-parameter limit). Returns the inserted rows.
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for data in rows:
+            data = self._filter_allowed(data or {})
+            if data:
+                groups.setdefault(tuple(sorted(data)), []).append(data)
+        if not groups:
+            raise ValueError("No allowed fields to insert")
+
+        out: List[Dict[str, Any]] = []
+        for keys, group in groups.items():
+            batch = max(1, min(_BULK_MAX_ROWS, _MAX_BIND_PARAMS // len(keys)))
+            for start in range(0, len(group), batch):
+                chunk = group[start:start + batch]
+                params = {f"r{i}c{j}": r[k] for i, r in enumerate(chunk) for j, k in enumerate(keys)}
+                out.extend(await fetch_all(_bulk_insert_sql(self.table, keys, len(chunk)), params))
+        return out
 
     async def update(self, item_id: Any, data: Dict[str, Any]) -> Dict[str, Any]:
         if not isinstance(data, dict) or not data:
@@ -56,16 +122,16 @@ class CRUDBase:
         data = self._filter_allowed(data)
         if not data:
             raise ValueError("No allowed fields to update")
-        set_clause = ", ".join(f'"{k}" = %({k})s' for k in data.keys())
         params = {**data, "id": item_id}
         row = await fetch_one(
-            f'UPDATE "{self.table}" SET {set_clause} WHERE "{self.id_column}" = %(id)s RETURNING *',
+            _update_sql(self.table, self.id_column, tuple(sorted(data))),
             params,
+            prepare=True,
         )
         if not row:
             raise KeyError(f"{self.table} not found")
         return row
 
     async def delete(self, item_id: Any) -> Dict[str, str]:
-        await execute(f'DELETE FROM "{self.table}" WHERE "{self.id_column}" = %(id)s', {"id": item_id})
-        return {"status": "deleted"}
\ No newline at end of file
+        await execute(_delete_sql(self.table, self.id_column), {"id": item_id}, prepare=True)
+        return {"status": "deleted"}
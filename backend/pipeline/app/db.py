@@ -1,18 +1,43 @@
 # app/db.py
 
 import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 DATABASE_URL = os.getenv("DATABASE_DSN")
-pool: psycopg.AsyncConnection | None = None
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "4"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "1"))
+pool: AsyncConnectionPool | None = None
+
+
+class _ScopedConnection:
+    """Holder for a lazily checked-out pool connection pinned by `connection_scope`."""
+
+    __slots__ = ("conn", "closed")
+
+    def __init__(self) -> None:
+        self.conn: Optional[psycopg.AsyncConnection] = None
+        self.closed = False
+
+
+_scoped_conn: ContextVar[Optional[_ScopedConnection]] = ContextVar("scoped_conn", default=None)
+
 
 async def connect_db():
-    """Establish a connection to the PostgreSQL database.
+    """Open the PostgreSQL connection pool.
 
-    This function initializes a global asynchronous connection (`pool`)
-    using the `DATABASE_DSN` environment variable.  
-    If the connection already exists, it does nothing.
+    This function initializes a global `AsyncConnectionPool` (`pool`)
+    using the `DATABASE_DSN` environment variable. Pool bounds are read
+    from `DB_POOL_MIN_SIZE` / `DB_POOL_MAX_SIZE` (defaults: 4 / 20).
+    Connections auto-prepare a statement once it has run
+    `DB_PREPARE_THRESHOLD` times (default: 1).
+    If the pool already exists, it does nothing.
 
     Raises:
         RuntimeError: If the `DATABASE_DSN` environment variable is not set.
@@ -22,17 +47,25 @@ async def connect_db():
     if pool is None:
         if not DATABASE_URL:
             raise RuntimeError("DATABASE_DSN is not set")
-        pool = await psycopg.AsyncConnection.connect(
+        new_pool = AsyncConnectionPool(
             DATABASE_URL,
-            row_factory=dict_row,
-            autocommit=True,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            kwargs={
+                "row_factory": dict_row,
+                "autocommit": True,
+                "prepare_threshold": DB_PREPARE_THRESHOLD,
+            },
+            open=False,
         )
+        await new_pool.open()
+        pool = new_pool
 
 
 async def disconnect_db():
-    """Close the active PostgreSQL connection.
+    """Close the PostgreSQL connection pool.
 
-    If no connection exists, this function does nothing.
+    If no pool exists, this function does nothing.
     """
     global pool
     if pool:
@@ -62,12 +95,63 @@ async def close_pool():
     await disconnect_db()
 
 
-async def fetch_all(query: str, params=None):
+@asynccontextmanager
+async def connection_scope() -> AsyncIterator[None]:
+    """Pin one pool connection for the queries issued inside the block.
+
+    The connection is checked out on the first query in the scope, reused by
+    every later `fetch_all`/`fetch_one`/`execute` in it, and returned to the
+    pool when the scope exits. Wrap only a handler's DB section with it, not
+    slow non-DB work such as LLM calls, so the pool isn't held idle.
+    """
+    holder = _ScopedConnection()
+    token = _scoped_conn.set(holder)
+    try:
+        yield
+    finally:
+        _scoped_conn.reset(token)
+        # Tasks spawned inside the scope copied the context and still see the
+        # holder; mark it closed so they fall back to their own checkouts.
+        holder.closed = True
+        conn, holder.conn = holder.conn, None
+        if conn is not None and pool is not None:
+            await pool.putconn(conn)
+
+
+@asynccontextmanager
+async def _connection() -> AsyncIterator[psycopg.AsyncConnection]:
+    """Yield the scope-pinned connection if any, else a short-lived pool checkout."""
+    if pool is None:
+        await connect_db()
+    holder = _scoped_conn.get()
+    if holder is None or holder.closed:
+        async with pool.connection() as conn:
+            yield conn
+        return
+    if holder.conn is None:
+        conn = await pool.getconn()
+        if holder.closed:
+            # The scope exited while we waited; don't pin into a dead holder.
+            try:
+                yield conn
+            finally:
+                await pool.putconn(conn)
+            return
+        if holder.conn is None:
+            holder.conn = conn
+        else:
+            await pool.putconn(conn)
+    yield holder.conn
+
+
+async def fetch_all(query: str, params=None, *, prepare: bool | None = None):
     """Fetch all rows matching the given SQL query.
 
     Args:
         query (str): SQL query to execute.
         params (dict | None): Query parameters to bind. Defaults to an empty dict.
+        prepare (bool | None): Force (`True`) or disable (`False`) a server-side
+            prepared statement. `None` leaves it to psycopg's auto-prepare.
 
     Returns:
         list[dict]: A list of rows, where each row is a dictionary
@@ -76,19 +160,19 @@ async def fetch_all(query: str, params=None):
     Raises:
         psycopg.DatabaseError: If the query execution fails.
     """
-    if pool is None:
-        await connect_db()
-    async with pool.cursor() as cur:
-        await cur.execute(query, params or {})
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.execute(query, params or {}, prepare=prepare)
         return await cur.fetchall()
 
 
-async def fetch_one(query: str, params=None):
+async def fetch_one(query: str, params=None, *, prepare: bool | None = None):
     """Fetch a single row matching the given SQL query.
 
     Args:
         query (str): SQL query to execute.
         params (dict | None): Query parameters to bind. Defaults to an empty dict.
+        prepare (bool | None): Force (`True`) or disable (`False`) a server-side
+            prepared statement. `None` leaves it to psycopg's auto-prepare.
 
     Returns:
         dict | None: A dictionary representing a single row, or
@@ -97,14 +181,12 @@ async def fetch_one(query: str, params=None):
     Raises:
         psycopg.DatabaseError: If the query execution fails.
     """
-    if pool is None:
-        await connect_db()
-    async with pool.cursor() as cur:
-        await cur.execute(query, params or {})
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.execute(query, params or {}, prepare=prepare)
         return await cur.fetchone()
 
 
-async def execute(query: str, params=None):
+async def execute(query: str, params=None, *, prepare: bool | None = None):
     """Execute a SQL statement without returning rows.
 
     Useful for `INSERT`, `UPDATE`, or `DELETE` statements.
@@ -112,11 +194,39 @@ async def execute(query: str, params=None):
     Args:
         query (str): SQL statement to execute.
         params (dict | None): Query parameters to bind. Defaults to an empty dict.
+        prepare (bool | None): Force (`True`) or disable (`False`) a server-side
+            prepared statement. `None` leaves it to psycopg's auto-prepare.
 
     Raises:
         psycopg.DatabaseError: If the statement execution fails.
     """
-    if pool is None:
-        await connect_db()
-    async with pool.cursor() as cur:
-        await cur.execute(query, params or {})
\ No newline at end of file
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.execute(query, params or {}, prepare=prepare)
+
+
+async def execute_many(query: str, params_seq):
+    """Execute one SQL statement for every parameter set in `params_seq`.
+
+    psycopg pipelines the statements, so a batch of rows costs a single
+    network round-trip instead of one per row.
+
+    Args:
+        query (str): SQL statement to execute.
+        params_seq (Iterable[dict]): Parameter sets to bind, one per execution.
+
+    Raises:
+        psycopg.DatabaseError: If any execution fails.
+    """
+    async with _connection() as conn, conn.cursor() as cur:
+        await cur.executemany(query, params_seq)
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[psycopg.AsyncConnection]:
+    """Yield a connection with an open transaction for multi-statement work.
+
+    Uses the scope-pinned connection when there is one. The transaction
+    commits when the block exits cleanly and rolls back on error.
+    """
+    async with _connection() as conn, conn.transaction():
+        yield conn
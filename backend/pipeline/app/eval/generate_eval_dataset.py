@@ -2,12 +2,15 @@
 
 import os
 import re
-import json
+import asyncio
+import hashlib
+import pickle
 import random
 import string
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 
+import orjson
 from langchain_groq import ChatGroq
 from langchain_core.messages import SystemMessage, HumanMessage
 
@@ -17,23 +20,26 @@ THIS_DIR = Path(__file__).resolve().parent
 REPO_SRC_ROOT = THIS_DIR / "laGGer" 
 TREE_PATH = THIS_DIR / "data/repos/repo_tree.txt"
 OUT_PATH = THIS_DIR / "data/eval/lagger_test_data.json"
+OUT_JSONL = OUT_PATH.with_suffix(".jsonl")
 DUMP_JSONL = THIS_DIR / "data/eval/chunks_dump.jsonl"
 DUMP_MD = THIS_DIR / "data/eval/chunks_preview.md"
 TOTAL_ITEMS = int(os.getenv("RAGAS_TESTSET_SIZE", "200"))
 SHOW_CHUNKS = os.getenv("SHOW_CHUNKS", "1") == "1"
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "8")))
 
 # assisted with ChatGPT 5
-ALLOW_EXT = {
+ALLOW_EXT = frozenset({
     ".py",".js",".jsx",".ts",".tsx",".java",".go",".rb",".rs",".php",".c",".h",".cpp",".hpp",
     ".cs",".kt",".swift",".m",".mm",".sql",".r",".pl",".scala",".sh",".bash",".ps1",
     ".yaml",".yml",".toml",".ini",".cfg",".json",".md"
-}
+})
+ALLOW_EXT_TUPLE = tuple(ALLOW_EXT)
 
-_TREE_RUNE_RE = re.compile(r"[│├└─]+")
+_TREE_TRANS = str.maketrans("", "", "│├└─")
 
 # assisted with ChatGPT 5
 def read_text(p: Path) -> str:
-    return p.read_text(encoding="utf-8")
+    return p.read_bytes().decode("utf-8")
 
 # assisted with ChatGPT 5
 def trim(s: str, lim: int) -> str:
@@ -47,7 +53,7 @@ def parse_paths_from_tree(tree_text: str) -> List[str]:
     """
     out = []
     for raw in tree_text.splitlines():
-        line = _TREE_RUNE_RE.sub("", raw).lstrip()
+        line = raw.translate(_TREE_TRANS).lstrip()
         if not line or line.endswith("/") or line.endswith(":"):
             continue
         if line.startswith("./"):
@@ -55,34 +61,65 @@ def parse_paths_from_tree(tree_text: str) -> List[str]:
         if line.startswith(".git") or line.endswith(".pyc"):
             continue
         out.append(line)
-    seen, uniq = set(), []
-    for p in out:
-        if p not in seen:
-            seen.add(p)
-            uniq.append(p)
-    return uniq
+    return list(dict.fromkeys(out))
+
+def load_tree_paths(tree_path: Path, tree_text: str) -> List[str]:
+    """
+    parse_paths_from_tree with a sidecar pickle cache keyed by the tree file's (size, mtime).
+    """
+    st = tree_path.stat()
+    key = (st.st_size, int(st.st_mtime))
+    cache_path = tree_path.with_suffix(".cache.pkl")
+    try:
+        with cache_path.open("rb") as f:
+            cached_key, rel_paths = pickle.load(f)
+        if cached_key == key:
+            return rel_paths
+    except Exception:
+        pass
+    rel_paths = parse_paths_from_tree(tree_text)
+    try:
+        with cache_path.open("wb") as f:
+            pickle.dump((key, rel_paths), f)
+    except OSError:
+        pass
+    return rel_paths
 
 def list_repo_files(repo_root: Path) -> List[str]:
     """
     Fallback: walk the repo to collect files if TREE_PATH is missing.
     """
     out: List[str] = []
-    for p in repo_root.rglob("*"):
-        if p.is_file() and p.suffix.lower() in ALLOW_EXT:
-            out.append(str(p.relative_to(repo_root)))
+    root = str(repo_root)
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(ALLOW_EXT_TUPLE) and entry.is_file():
+                    out.append(os.path.relpath(entry.path, root))
     return out
 
 def safe_read_file(p: Path) -> Optional[str]:
     try:
         if not p.exists() or not p.is_file():
             return None
-        return p.read_text(encoding="utf-8", errors="ignore")
+        return p.read_bytes().decode("utf-8", "ignore")
     except Exception:
         return None
 
 # assisted with ChatGPT 5
 _THINK_RE = re.compile(r"(?is)<\s*think\s*>.*?<\s*/\s*think\s*>")
 _FOLLOWUP_RE = re.compile(r"(?im)^\s*(follow-?up( question)?|next steps|what next)\s*:.*$", re.MULTILINE)
+_WS_NL_RE = re.compile(r"\s*\n\s*")
+_SPACES_RE = re.compile(r"[ \t]+")
+_KEY_RE = re.compile(r"\s+")
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
 
 # assisted with ChatGPT 5
 def clean_for_dataset(text: str) -> str:
@@ -90,11 +127,15 @@ def clean_for_dataset(text: str) -> str:
         return ""
     text = _THINK_RE.sub("", text)
     text = _FOLLOWUP_RE.sub("", text)
-    text = re.sub(r"\s+\n", "\n", text)
-    text = re.sub(r"\n\s+", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
+    text = _WS_NL_RE.sub("\n", text)
+    text = _SPACES_RE.sub(" ", text)
     return text.strip()
 
+def question_key(question: str) -> int:
+    """8-byte hash of the whitespace/case-normalized question, used for dedup."""
+    norm = _KEY_RE.sub(" ", question.lower())
+    return int.from_bytes(hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest(), "big")
+
 SYS_PROMPT_TMPL = string.Template(
     """You generate concise Q/A pairs grounded ONLY in the provided code chunk.
 
@@ -132,9 +173,9 @@ Code chunk:
 Return ONLY the JSON object, no commentary.
 """
 
-def call_llm_json(
+async def call_llm_json(
     llm: ChatGroq,
-    tree_text: str,
+    tree_trimmed: str,
     chunk_text: str,
     nmin=2,
     nmax=6,
@@ -144,7 +185,7 @@ def call_llm_json(
 ) -> List[Dict[str, str]]:
     sys_msg = SystemMessage(content=SYS_PROMPT_TMPL.substitute(nmin=nmin, nmax=nmax))
     human = HumanMessage(content=HUMAN_TMPL.format(
-        tree=trim(tree_text, 2000),
+        tree=tree_trimmed,
         path=file_path,
         start_line=span[0],
         end_line=span[1],
@@ -152,11 +193,12 @@ def call_llm_json(
     ))
 
     for _ in range(retries + 1):
-        resp = llm.invoke([sys_msg, human])
-        text = (resp.content or "").strip()
+        resp = await llm.ainvoke([sys_msg, human])
+        m = _JSON_RE.search(resp.content or "")
+        if not m:
+            continue
         try:
-            start, end = text.find("{"), text.rfind("}")
-            obj = json.loads(text[start:end+1])
+            obj = orjson.loads(m.group(0))
             out = []
             for s in obj.get("samples", []):
                 q = (s.get("question") or "").strip()
@@ -185,10 +227,11 @@ def iter_code_chunks(
 
     for rel in file_paths:
         stats["seen"] += 1
-        p = repo_root / rel
-        if p.suffix.lower() not in ALLOW_EXT:
+        if not rel.lower().endswith(ALLOW_EXT_TUPLE):
             stats["skip_ext"] += 1
             continue
+        p = repo_root / rel
+        rel_out = str(p.relative_to(repo_root))
         text = safe_read_file(p)
         if not text:
             stats["skip_empty"] += 1
@@ -206,18 +249,18 @@ def iter_code_chunks(
             if content:
                 stats["kept_chunks"] += 1
                 previews.append({
-                    "path": str(p.relative_to(repo_root)),
+                    "path": rel_out,
                     "start_line": s,
                     "end_line": e,
                     "preview": "\n".join(content.splitlines()[:40])
                 })
-                yield str(p.relative_to(repo_root)), content, s, e
+                yield rel_out, content, s, e
 
     if SHOW_CHUNKS:
         DUMP_JSONL.parent.mkdir(parents=True, exist_ok=True)
-        with DUMP_JSONL.open("w", encoding="utf-8") as f:
+        with DUMP_JSONL.open("wb") as f:
             for pr in previews:
-                f.write(json.dumps(pr, ensure_ascii=False) + "\n")
+                f.write(orjson.dumps(pr) + b"\n")
         with DUMP_MD.open("w", encoding="utf-8") as f:
             f.write("# Chunk preview\n\n")
             for pr in previews:
@@ -231,13 +274,17 @@ def iter_code_chunks(
         )
         print(f"[chunks] Dumped → {DUMP_MD}")
 
-def main():
+async def _bounded(sem: asyncio.Semaphore, coro):
+    async with sem:
+        return await coro
+
+async def main():
     if not os.getenv("GROQ_API_KEY"):
         raise RuntimeError("Set GROQ_API_KEY")
 
     if TREE_PATH.exists():
         tree_text = read_text(TREE_PATH)
-        rel_paths = parse_paths_from_tree(tree_text)
+        rel_paths = load_tree_paths(TREE_PATH, tree_text)
     else:
         tree_text = "(no tree file; walking repository)"
         rel_paths = list_repo_files(REPO_SRC_ROOT)
@@ -247,41 +294,62 @@ def main():
         raise RuntimeError("No chunks produced from repo")
 
     base_model = os.getenv("GROQ_MODEL", "qwen/qwen3-32b")
-    random.shuffle(chunks_list)
-
+    tree_trimmed = trim(tree_text, 2000)
     target = TOTAL_ITEMS
-    items: List[Dict[str, str]] = []
-    seen = set()
+    working = random.sample(chunks_list, k=min(len(chunks_list), target * 3))
+    written = 0
+    seen: set[int] = set()
     loop = 0
+    sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    wave = LLM_CONCURRENCY * 4
 
     unique_files = len({p for p, _, _, _ in chunks_list})
-    print(f"[info] Target size={target}, files={unique_files}, chunks={len(chunks_list)}")
-
-    while len(items) < target and loop < 50:
-        temp = 0.2 + (0.02 * loop % 0.4)
-        llm = ChatGroq(model=base_model, temperature=temp)
-
-        for path, content, s, e in chunks_list:
-            if len(items) >= target:
-                break
-            nmax = 8 if len(content) > 900 else 6 if len(content) > 500 else 4
-            nmin = max(1, nmax - 2)
-            samples = call_llm_json(
-                llm, tree_text, content, nmin=nmin, nmax=nmax, file_path=path, span=(s, e)
-            )
-            for srow in samples:
-                if len(items) >= target:
-                    break
-                key = re.sub(r"\s+", " ", srow["question"].lower())
-                if key in seen:
-                    continue
-                items.append({"question": srow["question"], "reference": srow["reference"]})
-                seen.add(key)
-        loop += 1
+    print(f"[info] Target size={target}, files={unique_files}, chunks={len(chunks_list)}, working={len(working)}, concurrency={LLM_CONCURRENCY}")
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(json.dumps(items[:target], indent=2, ensure_ascii=False), encoding="utf-8")
-    print(f"[done] Wrote {len(items[:target])} examples → {OUT_PATH}")
+    OUT_JSONL.parent.mkdir(parents=True, exist_ok=True)
+    with OUT_JSONL.open("wb") as out_f:
+        while written < target and loop < 50:
+            temp = 0.2 + (0.02 * loop % 0.4)
+            llm = ChatGroq(model=base_model, temperature=temp)
+
+            for w in range(0, len(working), wave):
+                if written >= target:
+                    break
+                tasks = []
+                for path, content, s, e in working[w:w + wave]:
+                    nmax = 8 if len(content) > 900 else 6 if len(content) > 500 else 4
+                    nmin = max(1, nmax - 2)
+                    tasks.append(_bounded(sem, call_llm_json(
+                        llm, tree_trimmed, content, nmin=nmin, nmax=nmax, file_path=path, span=(s, e)
+                    )))
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+
+                failures = [r for r in results if isinstance(r, BaseException)]
+                for exc in failures:
+                    print(f"[warn] LLM call failed: {type(exc).__name__}: {exc}")
+                if failures and len(failures) == len(results):
+                    raise RuntimeError(f"All {len(results)} LLM calls in wave failed") from failures[0]
+
+                for samples in results:
+                    if isinstance(samples, BaseException):
+                        continue
+                    for srow in samples:
+                        if written >= target:
+                            break
+                        key = question_key(srow["question"])
+                        if key in seen:
+                            continue
+                        row = {"question": srow["question"], "reference": srow["reference"]}
+                        out_f.write(orjson.dumps(row) + b"\n")
+                        out_f.flush()
+                        seen.add(key)
+                        written += 1
+            loop += 1
+
+    with OUT_JSONL.open("rb") as f:
+        items = [orjson.loads(line) for line in f if line.strip()]
+    OUT_PATH.write_bytes(orjson.dumps(items, option=orjson.OPT_INDENT_2))
+    print(f"[done] Wrote {len(items)} examples → {OUT_PATH} (stream: {OUT_JSONL})")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
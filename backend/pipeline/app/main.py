@@ -8,7 +8,10 @@ It:
 
 * Loads environment variables from a `.env` file if present.
 * Connects to and disconnects from the database on startup/shutdown.
+* Imports lazily-loaded heavy modules on startup, before serving traffic.
 * Sets up CORS so that any origin can access the API.
+* Serializes JSON responses with orjson (`ORJSONResponse`).
+* Gzip-compresses responses larger than 1 KiB when the client accepts it.
 * Registers all application routers under the `/api` prefix.
 * Exposes a `/api/health` route for basic health checking.
 
@@ -17,12 +20,15 @@ Routers included:
       document_chunks, rag_queries, retrieved_chunks, upload, repos and websocket.
 """
 
+import importlib
 import os
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 
 from app.db import connect_db, disconnect_db
@@ -38,12 +44,16 @@ DOTENV_PATH = Path(__file__).resolve().parent.parent.parent / ".env"
 if DOTENV_PATH.exists():
     load_dotenv(DOTENV_PATH)
 
+# Modules the request path imports lazily; loaded in each worker at startup
+# so the first query doesn't pay for them.
+PREWARM_MODULES = ("app.services.llm_client",)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events.
 
-    Connects to the database when the app starts and disconnects
-    when the app stops.
+    Connects to the database and imports `PREWARM_MODULES` when the
+    app starts, and disconnects when the app stops.
 
     Args:
         app: The FastAPI application instance.
@@ -52,6 +62,11 @@ async def lifespan(app: FastAPI):
         None: Control is passed to FastAPI to continue app startup.
     """
     await connect_db()
+    for name in PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"[warn] prewarm import of {name} failed:", repr(e))
     try:
         yield
     finally:
@@ -65,6 +80,7 @@ app = FastAPI(
     redoc_url="/redoc",
     openapi_url="/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -74,6 +90,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 for router in [
     auth.router,
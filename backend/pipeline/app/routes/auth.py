@@ -1,8 +1,11 @@
 # app/routes/auth.py
 
-from datetime import datetime, timedelta
+import asyncio
+import threading
+import time
 
-from fastapi import APIRouter, HTTPException, Depends
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 import jwt
@@ -16,11 +19,16 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer()
 
+# Verified tokens -> {"sub", "exp"}; entries expire after 30s so revoked
+# tokens stop being honoured quickly. Guarded by a lock because sync
+# dependencies run in the threadpool.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_token_cache_lock = threading.Lock()
+
 
 def create_access_token(user_id: str) -> str:
-    now = datetime.utcnow()
-    exp = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    payload = {"sub": user_id, "iat": now, "exp": exp}
+    now = int(time.time())
+    payload = {"sub": user_id, "iat": now, "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
@@ -28,11 +36,19 @@ def get_current_user_token(
     creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
 ) -> str:
     token = creds.credentials
+    with _token_cache_lock:
+        hit = _token_cache.get(token)
+    if hit and hit["exp"] > time.time():
+        return hit["sub"]
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid auth token")
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            with _token_cache_lock:
+                _token_cache[token] = {"sub": user_id, "exp": exp}
         return user_id
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid auth token")
@@ -41,13 +57,13 @@ def get_current_user_token(
 @router.post("/signup", response_model=TokenResponse)
 async def signup(req: SignupRequest):
     existing = await fetch_one(
-        "SELECT id FROM users WHERE email = %(email)s",
+        "SELECT id FROM users WHERE lower(email) = lower(%(email)s) LIMIT 1",
         {"email": req.email},
     )
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    pw_hash = pwd_ctx.hash(req.password)
+    pw_hash = await asyncio.to_thread(pwd_ctx.hash, req.password)
     row = await fetch_one(
         """
         INSERT INTO users (email, password_hash, display_name)
@@ -63,17 +79,21 @@ async def signup(req: SignupRequest):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(req: LoginRequest):
+async def login(req: LoginRequest, background_tasks: BackgroundTasks):
     row = await fetch_one(
-        "SELECT id, password_hash FROM users WHERE email = %(email)s",
+        "SELECT id, password_hash FROM users WHERE lower(email) = lower(%(email)s) LIMIT 1",
         {"email": req.email},
     )
-    if not row or not pwd_ctx.verify(req.password, row["password_hash"]):
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    ok = await asyncio.to_thread(pwd_ctx.verify, req.password, row["password_hash"])
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     user_id = str(row["id"])
 
-    await execute(
+    background_tasks.add_task(
+        execute,
         "UPDATE users SET last_login_at = now() WHERE id = %(id)s",
         {"id": user_id},
     )
@@ -89,6 +109,7 @@ async def me(user_id: str = Depends(get_current_user_token)):
         SELECT id, email, display_name, created_at, last_login_at
         FROM users
         WHERE id = %(id)s
+        LIMIT 1
         """,
         {"id": user_id},
     )
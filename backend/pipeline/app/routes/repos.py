@@ -2,22 +2,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Depends
+from pydantic import TypeAdapter
 
 from fastapi.responses import FileResponse
 from app.schemas.repo import RepoBrief
 
 from app.routes.auth import get_current_user_token
-from app.services.file_utils import list_files, read_file
+from app.services.file_utils import list_files
 from app.services.pipeline import query_codebase
-from app.utils import get_document_store
+from app.services.history import load_recent_history
 from app.schemas.query import QueryRequest, RepoQuery
 from app.services.progress import BROKER
-from app.config import UPLOAD_DIR, DATA_DIR
-from app.db import fetch_one, fetch_all, execute
+from app.config import UPLOAD_DIR, DATA_DIR, EMBEDDINGS_INDEX
+from app.db import connection_scope, fetch_one, fetch_all, execute
 
 from app.schemas.repo import (
     StatisticsResponse,
@@ -35,6 +41,26 @@ import shutil
 
 router = APIRouter(tags=["repos"], prefix="/repos")
 
+_REPO_QUERIES = TypeAdapter(List[RepoQuery])
+
+# repo_id -> indexed chunk count; dropped on (re)index and delete.
+_DOC_COUNT: TTLCache = TTLCache(maxsize=4096, ttl=10)
+# repo_id -> row count in the pgvector table, reused across list_documents pages.
+_EMBEDDED_COUNT: TTLCache = TTLCache(maxsize=4096, ttl=10)
+# user_id -> [{id, label, source_type}, ...]; shared by /briefs and /names.
+_USER_REPO_INDEX: TTLCache = TTLCache(maxsize=1024, ttl=5)
+# repo_id -> whether uploads/<repo_id> is a directory (positive and negative).
+_REPO_DIR_EXISTS: TTLCache = TTLCache(maxsize=4096, ttl=2)
+# repo_id -> realpath of uploads/<repo_id>, used as the traversal-check root.
+_REPO_ROOTS: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
+
+def _invalidate_repo_caches(repo_id: str) -> None:
+    _DOC_COUNT.pop(repo_id, None)
+    _EMBEDDED_COUNT.pop(repo_id, None)
+    _REPO_DIR_EXISTS.pop(repo_id, None)
+    _REPO_ROOTS.pop(repo_id, None)
+
 async def mark_repo_indexed(repo_id: str) -> None:
     """
     Set last_indexed_at and record a lightweight status flag in repos.metadata.
@@ -55,6 +81,7 @@ async def mark_repo_indexed(repo_id: str) -> None:
         """,
         {"id": repo_id},
     )
+    _invalidate_repo_caches(repo_id)
 
 async def upsert_repo(
     *,
@@ -93,23 +120,14 @@ async def upsert_repo(
             "shared": is_shared,
         },
     )
+    _invalidate_repo_caches(repo_id)
+    if owner_user_id:
+        _USER_REPO_INDEX.pop(str(owner_user_id), None)
     return {"id": row["id"], "name": row["name"], "title": row["title"], "is_shared": row["is_shared"]}
 
 @router.get("/briefs")
 async def my_repo_briefs(user_id: str = Depends(get_current_user_token)) -> list[RepoBrief]:
-    rows = await fetch_all(
-        """
-        SELECT
-          id,
-          COALESCE(NULLIF(btrim(title), ''), NULLIF(btrim(name), ''), id) AS label,
-          source_type
-        FROM repos
-        WHERE owner_user_id = %(owner)s
-        ORDER BY created_at DESC
-        """,
-        {"owner": user_id},
-    )
-    return [{"id": r["id"], "label": r["label"], "source_type": r["source_type"]} for r in (rows or [])]
+    return list(await _load_user_repo_index(user_id))
 
 @router.post("", summary="Create or update a repo row")
 async def create_or_update_repo(
@@ -133,15 +151,32 @@ async def create_or_update_repo(
         is_shared=is_shared,
     )
 
-async def _get_repo_row(repo_id: str) -> Optional[Dict[str, Any]]:
-    return await fetch_one(
-        """
-        SELECT id, owner_user_id, name, title, is_shared
-        FROM repos
-        WHERE id = %(id)s
+async def _auth_and_fetch(
+    repo_id: str,
+    user_id: str,
+    extra_sql: str = "",
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch the repo row only if the caller can access it (owner or shared),
+    in one round-trip. `extra_sql` is appended to the SELECT list (it must
+    start with a comma and may reference the row as `r`), so a handler can
+    pull its own data alongside the access check.
+    Raises 404 on a miss to avoid leaking repo existence.
+    NOTE: extra_sql must come from trusted code, not user input.
+    """
+    row = await fetch_one(
+        f"""
+        SELECT r.id, r.owner_user_id, r.name, r.title, r.is_shared{extra_sql}
+        FROM repos r
+        WHERE r.id = %(id)s
+          AND (r.owner_user_id = %(user)s OR r.is_shared = TRUE)
         """,
-        {"id": repo_id},
+        {**(extra_params or {}), "id": repo_id, "user": user_id},
     )
+    if not row:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    return row
 
 
 async def _assert_repo_access(repo_id: str, user_id: str) -> Dict[str, Any]:
@@ -151,32 +186,47 @@ async def _assert_repo_access(repo_id: str, user_id: str) -> Dict[str, Any]:
       - is_shared = true
     Otherwise raise 404 to avoid leaking repo existence.
     """
-    row = await _get_repo_row(repo_id)
-    if not row:
-        raise HTTPException(status_code=404, detail="Repository not found")
-
-    owner = row.get("owner_user_id")
-    is_shared = bool(row.get("is_shared"))
+    return await _auth_and_fetch(repo_id, user_id)
 
-    if owner is not None and str(owner) == str(user_id):
-        return row
-    if is_shared:
-        return row
 
-    raise HTTPException(status_code=404, detail="Repository not found")
+# Projected by _auth_and_fetch for the status routes.
+_HAS_DOCS_SQL = """,
+          EXISTS (
+            SELECT 1
+            FROM document_chunks dc
+            JOIN documents d ON d.id = dc.document_id
+            WHERE d.repo_id = r.id
+          ) AS has_docs"""
 
 
-async def _list_repo_names_for_user(user_id: str) -> Dict[str, str]:
+async def _load_user_repo_index(user_id: str) -> List[Dict[str, Any]]:
+    """
+    The caller's repos as [{id, label, source_type}], newest first.
+    Cached per user for a few seconds; treat the result as read-only.
+    """
+    key = str(user_id)
+    cached = _USER_REPO_INDEX.get(key)
+    if cached is not None:
+        return cached
     rows = await fetch_all(
         """
-        SELECT id, COALESCE(NULLIF(btrim(title), ''), NULLIF(btrim(name), ''), id) AS label
+        SELECT
+          id,
+          COALESCE(NULLIF(btrim(title), ''), NULLIF(btrim(name), ''), id) AS label,
+          source_type
         FROM repos
         WHERE owner_user_id = %(owner)s
         ORDER BY created_at DESC
         """,
         {"owner": user_id},
     )
-    return {r["id"]: r["label"] for r in (rows or [])}
+    index = [{"id": r["id"], "label": r["label"], "source_type": r["source_type"]} for r in (rows or [])]
+    _USER_REPO_INDEX[key] = index
+    return index
+
+
+async def _list_repo_names_for_user(user_id: str) -> Dict[str, str]:
+    return {r["id"]: r["label"] for r in await _load_user_repo_index(user_id)}
 
 def _repo_filter(repo_id: str) -> dict:
     return {
@@ -188,38 +238,99 @@ def _repo_filter(repo_id: str) -> dict:
     }
 
 
+_UPLOAD_PHASES = frozenset({"upload", "cloning"})
+_INDEX_PHASES = frozenset({"indexing", "embedding", "chunking"})
+_RUNNING_LIKE = frozenset({"queued", "running"})
+
+
 def _map_broker_to_status(phases: Dict[str, Any]) -> Optional[str]:
     if not phases:
         return None
 
-    def st(name: str) -> str:
-        s = phases.get(name) or {}
-        return (s.get("status") or "").lower()
-
-    for p in phases.values():
-        if isinstance(p, dict) and (p.get("status") or "").lower() == "error":
+    uploading = indexing = False
+    for name, p in phases.items():
+        if not isinstance(p, dict):
+            continue
+        status = (p.get("status") or "").lower()
+        if status == "error":
             return "error"
+        if status in _RUNNING_LIKE:
+            if name in _UPLOAD_PHASES:
+                uploading = True
+            elif name in _INDEX_PHASES:
+                indexing = True
 
-    running_like = {"queued", "running"}
-    if st("upload") in running_like or st("cloning") in running_like:
+    if uploading:
         return "upload"
-    if st("indexing") in running_like or st("embedding") in running_like or st("chunking") in running_like:
+    if indexing:
         return "indexing"
-
     return None
 
 
-def _count_documents(repo_id: str) -> int:
-    store = get_document_store()
-    docs = store.filter_documents(filters=_repo_filter(repo_id))
+async def _count_documents(repo_id: str) -> int:
+    cached = _DOC_COUNT.get(repo_id)
+    if cached is not None:
+        return cached
+    row = await fetch_one(
+        """
+        SELECT COUNT(*) AS n
+        FROM document_chunks dc
+        JOIN documents d ON d.id = dc.document_id
+        WHERE d.repo_id = %(id)s
+        """,
+        {"id": repo_id},
+    )
+    n = int(row["n"]) if row else 0
+    _DOC_COUNT[repo_id] = n
+    return n
+
+
+def _resolve_repo_file(repo_id: str, rel_path: str) -> Optional[str]:
+    """
+    Real path of `rel_path` inside the repo, or None if it escapes the repo
+    root or is not a regular file. Blocking; call from a worker thread.
+    """
+    rel = os.path.normpath(rel_path)
+    if os.path.isabs(rel) or rel == ".." or rel.startswith(".." + os.sep):
+        return None
+    root = _REPO_ROOTS.get(repo_id)
+    if root is None:
+        root = os.path.realpath(os.path.join(UPLOAD_DIR, repo_id))
+        _REPO_ROOTS[repo_id] = root
+    # One realpath on the target still catches symlinks pointing outside.
+    full = os.path.realpath(os.path.join(root, rel))
+    if not full.startswith(root + os.sep) or not os.path.isfile(full):
+        return None
+    return full
+
+
+# Largest file body returned inline by /file; use ?raw=true for the rest.
+FILE_VIEW_MAX_BYTES = 2 * 1024 * 1024
+
+
+def _read_repo_text(repo_id: str, rel_path: str) -> Optional[Tuple[str, bool]]:
+    """(text, truncated) for a repo file capped at FILE_VIEW_MAX_BYTES, or None."""
+    full = _resolve_repo_file(repo_id, rel_path)
+    if full is None:
+        return None
+    with open(full, "rb") as f:
+        data = f.read(FILE_VIEW_MAX_BYTES + 1)
+    truncated = len(data) > FILE_VIEW_MAX_BYTES
+    if truncated:
+        data = data[:FILE_VIEW_MAX_BYTES]
     try:
-        return len(docs)
-    except Exception:
-        return sum(1 for _ in docs)
+        return data.decode("utf-8"), truncated
+    except UnicodeDecodeError:
+        return data.decode("utf-8", errors="ignore"), truncated
 
 
 def _repo_dir_exists(repo_id: str) -> bool:
-    return (Path(UPLOAD_DIR) / repo_id).exists()
+    cached = _REPO_DIR_EXISTS.get(repo_id)
+    if cached is not None:
+        return cached
+    exists = os.path.isdir(os.path.join(UPLOAD_DIR, repo_id))
+    _REPO_DIR_EXISTS[repo_id] = exists
+    return exists
 
 
 async def _snap_broker(repo_id: str) -> Dict[str, Any]:
@@ -231,25 +342,26 @@ async def _snap_broker(repo_id: str) -> Dict[str, Any]:
     return {}
 
 
-async def _compute_status(repo_id: str) -> Tuple[str, Dict[str, PhaseState], Dict[str, Any]]:
+async def _compute_status(
+    repo_id: str, has_docs: bool
+) -> Tuple[str, Dict[str, PhaseState], Dict[str, Any]]:
     if not _repo_dir_exists(repo_id):
         return "missing", {}, {"documents": 0}
 
-    snap: Dict[str, Any] = await _snap_broker(repo_id)
+    snap = await _snap_broker(repo_id)
     raw_phases = (snap.get("phases") or {}) if isinstance(snap, dict) else {}
     typed_phases: Dict[str, PhaseState] = {
         k: PhaseState(**v) for k, v in raw_phases.items() if isinstance(v, dict)
     }
 
-    doc_count = _count_documents(repo_id)
-    if doc_count > 0:
-        return "indexed", typed_phases, {"documents": doc_count}
+    if has_docs:
+        return "indexed", typed_phases, {"documents": await _count_documents(repo_id)}
 
     broker_status = _map_broker_to_status(raw_phases)
     if broker_status:
-        return broker_status, typed_phases, {"documents": doc_count}
+        return broker_status, typed_phases, {"documents": 0}
 
-    return "new", typed_phases, {"documents": doc_count}
+    return "new", typed_phases, {"documents": 0}
 
 
 @router.get("/names")
@@ -262,12 +374,12 @@ async def my_repo_names(user_id: str = Depends(get_current_user_token)) -> Dict[
 
 @router.get("/{repo_id}/status", response_model=RepoStatusResponse)
 async def get_status(repo_id: str, user_id: str = Depends(get_current_user_token)):
-    await _assert_repo_access(repo_id, user_id)
+    row = await _auth_and_fetch(repo_id, user_id, _HAS_DOCS_SQL)
 
     if not _repo_dir_exists(repo_id):
         raise HTTPException(status_code=404, detail="Repository not found")
 
-    status, typed, stats = await _compute_status(repo_id)
+    status, typed, stats = await _compute_status(repo_id, bool(row["has_docs"]))
     return RepoStatusResponse(repoId=repo_id, status=status, phases=typed, stats=stats)
 
 
@@ -285,34 +397,53 @@ def get_files(repo_id: str, user_id: str = Depends(get_current_user_token)):
     response_model=FileContentResponse,
     responses={404: {"description": "File not found"}},
 )
-def get_file(
+async def get_file(
     repo_id: str,
     path: str = Query(..., description="Relative path to file in the repo"),
+    raw: bool = Query(False, description="Stream the whole file as text/plain instead of JSON"),
     user_id: str = Depends(get_current_user_token),
 ):
-    repo_dir = (Path(UPLOAD_DIR) / repo_id).resolve()
-    file_path = (repo_dir / path).resolve()
-    if not str(file_path).startswith(str(repo_dir)) or not file_path.is_file():
+    await _assert_repo_access(repo_id, user_id)
+    if raw:
+        file_path = await asyncio.to_thread(_resolve_repo_file, repo_id, path)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        return FileResponse(file_path, media_type="text/plain; charset=utf-8")
+    try:
+        result = await asyncio.to_thread(_read_repo_text, repo_id, path)
+    except OSError:
+        result = None
+    if result is None:
         raise HTTPException(status_code=404, detail="File not found")
+    content, truncated = result
+    return FileContentResponse(content=content, truncated=truncated)
 
-    try:
-        content = read_file(repo_id, path)
-    except Exception:
-        try:
-            content = file_path.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            raise HTTPException(status_code=404, detail="File not found")
-    return FileContentResponse(content=content)
+
+@lru_cache(maxsize=512)
+def _load_queries(path: str, mtime_ns: int, size: int) -> List[RepoQuery]:
+    """Parsed query history; the (mtime_ns, size) key drops stale entries on append.
+
+    `queries.jsonl` holds one entry per line; legacy `queries.json` files
+    hold a single JSON array.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".jsonl"):
+        return _REPO_QUERIES.validate_python([orjson.loads(line) for line in data.splitlines() if line.strip()])
+    return _REPO_QUERIES.validate_python(orjson.loads(data))
 
 
 @router.get("/{repo_id}/queries", response_model=List[RepoQuery])
 def get_queries(repo_id: str, user_id: str = Depends(get_current_user_token)):
-    qpath = Path(DATA_DIR) / repo_id / "queries.json"
-    if not qpath.exists():
-        return []
-    import json
-    data = json.loads(qpath.read_text(encoding="utf-8"))
-    return [RepoQuery(**item) for item in data]
+    out: List[RepoQuery] = []
+    for name in ("queries.json", "queries.jsonl"):
+        qpath = Path(DATA_DIR) / repo_id / name
+        try:
+            st = qpath.stat()
+        except FileNotFoundError:
+            continue
+        out.extend(_load_queries(str(qpath), st.st_mtime_ns, st.st_size))
+    return out
 
 
 @router.get("/statistics", response_model=StatisticsResponse)
@@ -320,25 +451,29 @@ async def statistics(
     repoId: str = Query(..., alias="repoId", description="Repository ID"),
     user_id: str = Depends(get_current_user_token),
 ):
-    await _assert_repo_access(repoId, user_id)
+    row = await _auth_and_fetch(repoId, user_id, _HAS_DOCS_SQL)
 
     if not _repo_dir_exists(repoId):
         return StatisticsResponse(index_status="missing", document_count=0)
 
-    status, _typed, stats = await _compute_status(repoId)
+    status, _typed, stats = await _compute_status(repoId, bool(row["has_docs"]))
     return StatisticsResponse(
         index_status=status,
         document_count=int(stats.get("documents", 0)),
     )
 
 @router.delete("/{repo_id}", summary="Delete a repository and its data")
-async def delete_repo(repo_id: str, user_id: str = Depends(get_current_user_token)):
+async def delete_repo(
+    repo_id: str,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user_token),
+):
     """
     Hard-delete the repo:
       - verify access
       - delete conversations referencing this repo (if such a table exists)
       - delete the repo row
-      - best-effort remove uploaded files on disk
+      - best-effort remove uploaded files on disk (after the response)
     """
     await _assert_repo_access(repo_id, user_id)
 
@@ -358,25 +493,56 @@ async def delete_repo(repo_id: str, user_id: str = Depends(get_current_user_toke
     if not deleted:
         raise HTTPException(status_code=404, detail="Repository not found")
 
+    _invalidate_repo_caches(repo_id)
+    _USER_REPO_INDEX.pop(str(user_id), None)
+
     repo_path = Path(UPLOAD_DIR) / repo_id
-    try:
-        shutil.rmtree(repo_path, ignore_errors=True)
-    except Exception:
-        pass
+    background_tasks.add_task(shutil.rmtree, repo_path, ignore_errors=True)
 
     return {"status": "deleted", "repoId": repo_id}
 
+_DOC_FIELDS = ("id", "content", "meta")
+
+
 @router.get("/list_documents", response_model=ListDocumentsResponse)
 async def list_documents(
     repoId: str = Query(..., alias="repoId", description="Repository ID"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    fields: str = Query("id,content,meta", description="Comma-separated subset of id,content,meta"),
     user_id: str = Depends(get_current_user_token),
 ):
-    await _assert_repo_access(repoId, user_id)
+    """
+    One page of the repo's indexed chunks, read straight from the pgvector
+    table so LIMIT/OFFSET and the column projection happen in SQL.
+    Both queries use the (meta->>'repo_id', id) index; the total is counted
+    on the first page and reused from a short-lived cache after that.
+    """
+    wanted = {f.strip() for f in fields.split(",")} & set(_DOC_FIELDS)
+    cols = ", ".join(c for c in _DOC_FIELDS if c == "id" or c in wanted)
+    # Every writer sets meta.repo_id, so this one expression is enough.
+    where = "meta->>'repo_id' = %(repo)s"
+    total = _EMBEDDED_COUNT.get(repoId) if offset else None
+    count_sql = (
+        f', (SELECT COUNT(*) FROM "{EMBEDDINGS_INDEX}" WHERE {where}) AS total'
+        if total is None
+        else ""
+    )
 
-    store = get_document_store()
-    docs = store.filter_documents(filters=_repo_filter(repoId))
-    items = [DocumentItem(id=d.id, content=d.content, meta=d.meta or {}) for d in docs]
-    return ListDocumentsResponse(documents=items)
+    async with connection_scope():
+        repo = await _auth_and_fetch(repoId, user_id, count_sql, {"repo": repoId})
+        rows = await fetch_all(
+            f'SELECT {cols} FROM "{EMBEDDINGS_INDEX}" WHERE {where} ORDER BY id LIMIT %(l)s OFFSET %(o)s',
+            {"repo": repoId, "l": limit, "o": offset},
+        )
+    if total is None:
+        total = int(repo["total"] or 0)
+        _EMBEDDED_COUNT[repoId] = total
+    items: List[DocumentItem] = [
+        {"id": r["id"], "content": r.get("content"), "meta": r.get("meta") or {}}
+        for r in rows
+    ]
+    return ListDocumentsResponse(documents=items, total=total)
 
 
 @router.post("/answer", response_model=AnswerResponse, status_code=200)
@@ -389,7 +555,11 @@ async def answer(req: AnswerRequest, user_id: str = Depends(get_current_user_tok
     if not repo_id or not question:
         raise HTTPException(status_code=422, detail="Both repo_id (or repoId) and query (or question) are required.")
 
-    await _assert_repo_access(repo_id, user_id)
+    # Both queries share one pinned connection; it goes back to the pool
+    # before query_codebase starts the LLM call.
+    async with connection_scope():
+        await _assert_repo_access(repo_id, user_id)
+        recent_turns = await load_recent_history(conv_id, limit=6)
 
     qr = QueryRequest(
         repoId=repo_id,
@@ -398,7 +568,9 @@ async def answer(req: AnswerRequest, user_id: str = Depends(get_current_user_tok
         userId=user_from_req or user_id,
     )
 
-    answer_text, contexts = await query_codebase(qr, filters=_repo_filter(repo_id))
+    answer_text, contexts = await query_codebase(
+        qr, filters=_repo_filter(repo_id), recent_turns=recent_turns
+    )
 
     return AnswerResponse(
         answer=answer_text,
@@ -409,14 +581,13 @@ async def answer(req: AnswerRequest, user_id: str = Depends(get_current_user_tok
 from fastapi.responses import FileResponse
 
 @router.get("/{repo_id}/raw")
-def get_file_raw(
+async def get_file_raw(
     repo_id: str,
     path: str = Query(..., description="Relative path to file in the repo"),
     user_id: str = Depends(get_current_user_token),
 ):
-    _ = asyncio.run(_assert_repo_access(repo_id, user_id)) if False else None
-    repo_dir = (Path(UPLOAD_DIR) / repo_id).resolve()
-    file_path = (repo_dir / path).resolve()
-    if not str(file_path).startswith(str(repo_dir)) or not file_path.is_file():
+    await _assert_repo_access(repo_id, user_id)
+    file_path = await asyncio.to_thread(_resolve_repo_file, repo_id, path)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
\ No newline at end of file
+    return FileResponse(file_path)
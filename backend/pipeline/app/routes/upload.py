@@ -1,6 +1,8 @@
 # app/routes/upload.py
 
 from pathlib import Path
+import asyncio
+import shutil
 import uuid
 
 from fastapi import (
@@ -13,8 +15,6 @@ from fastapi import (
     Depends,
 )
 
-import aiofiles
-
 from app.routes.auth import get_current_user_token
 from app.config import UPLOAD_DIR
 from app.routes import repos as repos_routes
@@ -22,6 +22,15 @@ from app.services.upload import handle_github_clone, handle_zip_upload_from_path
 
 router = APIRouter(tags=["upload"])
 
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _copy_upload(src, dest: Path) -> None:
+    """Copy the spooled upload to `dest` in large blocks (runs in a worker thread)."""
+    src.seek(0)
+    with open(dest, "wb") as out_f:
+        shutil.copyfileobj(src, out_f, length=COPY_CHUNK_SIZE)
+
 
 @router.post("/upload", status_code=202)
 async def upload_repo(
@@ -78,13 +87,7 @@ async def upload_repo(
     tmp_zip_path = final_zip_path.with_suffix(final_zip_path.suffix + ".part")
 
     try:
-        chunk_size = 1024 * 1024
-        async with aiofiles.open(tmp_zip_path, "wb") as out_f:
-            while True:
-                chunk = await file.read(chunk_size)
-                if not chunk:
-                    break
-                await out_f.write(chunk)
+        await asyncio.to_thread(_copy_upload, file.file, tmp_zip_path)
     except Exception as e:
         try:
             if tmp_zip_path.exists():
@@ -1,6 +1,7 @@
 # app/schemas/repo.py
 
-from typing import List, Optional, Dict, Any,TypedDict
+from typing import List, Optional, Dict, Any
+from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 from pydantic.config import ConfigDict
 
@@ -8,15 +9,18 @@ class StatisticsResponse(BaseModel):
     index_status: str
     document_count: int
 
-class DocumentItem(BaseModel):
+class DocumentItem(TypedDict):
+    # Plain dict rows: validated in bulk by pydantic-core, no per-item model.
     id: str
-    content: str
+    content: Optional[str]
     meta: dict
 
 class ListDocumentsResponse(BaseModel):
     documents: List[DocumentItem]
+    total: int = 0
 
 class ContextDoc(BaseModel):
+    model_config = ConfigDict(frozen=True)
     filename: str
     content: str
     id: Optional[str] = None
@@ -36,7 +40,9 @@ class AnswerResponse(BaseModel):
     contexts: List[ContextDoc] = Field(default_factory=list)
 
 class FileContentResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
     content: str
+    truncated: bool = False
 
 class PhaseState(BaseModel):
     status: Optional[str] = None 
@@ -58,6 +64,7 @@ from typing import Literal, Optional
 from pydantic import BaseModel
 
 class RepoBrief(BaseModel):
+    model_config = ConfigDict(frozen=True)
     id: str
     label: str
     source_type: Optional[Literal["git", "upload"]] = None
\ No newline at end of file
@@ -1,51 +1,83 @@
 # app/services/chunks.py
 
-import hashlib
 from typing import Dict, Optional, List
 import re as _re
 
-from app.db import fetch_one
+from app.db import fetch_all
+
+_DOC_NUM_RE = _re.compile(r'\bDocument\s+(\d+)\b')
 
 def rewrite_doc_numbers_to_filenames(answer: str, file_order: List[str]) -> str:
     """Turn 'Document N' into `filename`."""
     def repl(m):
         idx = int(m.group(1)) - 1
         return f"`{file_order[idx]}`" if 0 <= idx < len(file_order) else m.group(0)
-    return _re.sub(r'\bDocument\s+(\d+)\b', repl, answer)
-
-async def resolve_chunk_id(meta: Dict, content: str) -> Optional[str]:
-    """Map retriever meta/content to document_chunks.id for persistence."""
-    chunk_id = meta.get("document_chunk_id") or meta.get("chunk_id")
-    if chunk_id:
-        row = await fetch_one(
-            "SELECT id FROM document_chunks WHERE id = %(id)s LIMIT 1",
-            {"id": chunk_id},
-        )
-        if row:
-            return str(row["id"])
-
-    doc_id = meta.get("document_id") or meta.get("doc_id")
-    chunk_index = meta.get("chunk_index")
-    if doc_id is not None and chunk_index is not None:
-        row = await fetch_one(
-            """
-            SELECT id
-            FROM document_chunks
-            WHERE document_id = %(doc_id)s AND chunk_index = %(idx)s
-            LIMIT 1
-            """,
-            {"doc_id": doc_id, "idx": chunk_index},
-        )
-        if row:
-            return str(row["id"])
-
-    text = (content or "").strip()
-    if text:
-        h = hashlib.sha256(text.encode("utf-8")).hexdigest()
-        row = await fetch_one(
-            "SELECT id FROM document_chunks WHERE chunk_hash = %(h)s LIMIT 1",
-            {"h": h},
-        )
-        if row:
-            return str(row["id"])
-    return None
+    return _DOC_NUM_RE.sub(repl, answer)
+
+_RESOLVE_CHUNKS_SQL = """
+SELECT q.ord, m.id
+FROM unnest(%(cids)s::text[], %(doc_ids)s::text[], %(idxs)s::text[])
+     WITH ORDINALITY AS q(cid, doc_id, idx, ord)
+CROSS JOIN LATERAL (
+  SELECT id, prio
+  FROM (
+    SELECT id, 1 AS prio
+    FROM document_chunks
+    WHERE q.cid IS NOT NULL AND id = q.cid::uuid
+    UNION ALL
+    SELECT id, 2
+    FROM document_chunks
+    WHERE q.doc_id IS NOT NULL
+      AND document_id = q.doc_id::uuid AND chunk_index = q.idx::int
+  ) s
+  ORDER BY prio
+  LIMIT 1
+) m
+"""
+
+
+def _opt_str(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+async def resolve_chunk_ids(metas: List[Dict]) -> List[Optional[str]]:
+    """
+    Map retriever metas to document_chunks.id for persistence.
+    For each meta tries chunk id, then (document_id, chunk_index); the whole
+    batch is one round-trip. Order matches `metas`. Metas carrying neither
+    resolve to None without any per-item work beyond the key lookups.
+    """
+    out: List[Optional[str]] = [None] * len(metas)
+    cids: List[Optional[str]] = []
+    doc_ids: List[Optional[str]] = []
+    idxs: List[Optional[str]] = []
+    pos: List[int] = []
+    for i, meta in enumerate(metas):
+        chunk_id = meta.get("document_chunk_id") or meta.get("chunk_id") or None
+        doc_id = meta.get("document_id") or meta.get("doc_id")
+        chunk_index = meta.get("chunk_index")
+        if doc_id is None or chunk_index is None:
+            doc_id = chunk_index = None
+        if chunk_id is None and doc_id is None:
+            continue
+
+        pos.append(i)
+        cids.append(_opt_str(chunk_id))
+        doc_ids.append(_opt_str(doc_id))
+        idxs.append(_opt_str(chunk_index))
+
+    if not pos:
+        return out
+    rows = await fetch_all(
+        _RESOLVE_CHUNKS_SQL,
+        {"cids": cids, "doc_ids": doc_ids, "idxs": idxs},
+        prepare=True,
+    )
+    for row in rows:
+        out[pos[row["ord"] - 1]] = str(row["id"])
+    return out
+
+
+async def resolve_chunk_id(meta: Dict) -> Optional[str]:
+    """Single-item :func:`resolve_chunk_ids`."""
+    return (await resolve_chunk_ids([meta]))[0]
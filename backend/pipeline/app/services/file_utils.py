@@ -17,6 +17,44 @@ def list_files(repo_id: str):
             files.append(rel)
     return files
 
+def normalize_newlines(text: str) -> str:
+    """Translate `\\r\\n` and lone `\\r` to `\\n`, like text-mode `open()` does."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+def list_files_with_stat(repo_path: str):
+    """Yield (rel_path, abs_path, is_symlink, size) for every non-hidden regular file.
+
+    One `os.scandir` pass; directories whose name starts with "." are never
+    entered. Symlinked files report their target's size; symlinked
+    directories are not followed (same as `os.walk`).
+    """
+    stack = [(repo_path, "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.name[0] == ".":
+                        continue
+                    rel = rel_dir + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append((entry.path, rel + os.sep))
+                            continue
+                        if not entry.is_file():
+                            continue  # symlink to a directory, socket, FIFO, ...
+                        # Reuses scandir's lstat for regular files.
+                        size = entry.stat().st_size
+                    except OSError:
+                        continue
+                    yield rel, entry.path, entry.is_symlink(), size
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+
 def read_file(repo_id: str, rel_path: str) -> str:
     full = UPLOAD_DIR / repo_id / rel_path
     if not full.exists():
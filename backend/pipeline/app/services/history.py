@@ -3,7 +3,7 @@
 import re as _re
 from typing import Dict, List, Optional, Tuple
 
-from app.db import fetch_one
+from app.db import fetch_all
 from app.config import (
     MODEL_CONTEXT_TOKENS,
     TOKENS_PER_CHAR,
@@ -12,26 +12,26 @@ from app.config import (
     MAX_HISTORY_TOKENS,
 )
 
+_CODE_FENCE_RE = _re.compile(r"```.*?```", _re.DOTALL)
+_WS_RE = _re.compile(r"\s+")
+
 async def load_recent_history(conversation_id: Optional[str], limit: int = 12) -> List[Dict]:
     """
     Newest-first turns: [{ query_text, response_text, created_at }, ...]
     """
     if not conversation_id:
         return []
-    rows = await fetch_one(
+    rows = await fetch_all(
         """
-        SELECT json_agg(t.* ORDER BY t.created_at DESC) AS items
-        FROM (
-          SELECT query_text, response_text, created_at
-          FROM rag_queries
-          WHERE conversation_id = %(cid)s
-          ORDER BY created_at DESC
-          LIMIT %(lim)s
-        ) t
+        SELECT query_text, response_text, created_at
+        FROM rag_queries
+        WHERE conversation_id = %(cid)s
+        ORDER BY created_at DESC
+        LIMIT %(lim)s
         """,
         {"cid": conversation_id, "lim": limit},
     )
-    return (rows.get("items") if rows else []) or []
+    return rows or []
 
 def _chars_for_tokens(tokens: int) -> int:
     return max(0, int(tokens / max(TOKENS_PER_CHAR, 1e-6)))
@@ -47,8 +47,12 @@ def compact(text: str, max_chars: Optional[int]) -> str:
     if not text:
         return ""
     s = text.strip()
-    s = _re.sub(r"```.*?```", "[code omitted]", s, flags=_re.DOTALL)
-    s = _re.sub(r"\s+", " ", s)
+    if "```" in s:
+        s = _CODE_FENCE_RE.sub("[code omitted]", s)
+    # Every whitespace char except " " is non-printable, so this only skips
+    # the sub when it would be a no-op.
+    if "  " in s or not s.isprintable():
+        s = _WS_RE.sub(" ", s)
     if max_chars is None:
         return s
     return (s[: max_chars - 1] + "…") if len(s) > max_chars else s
@@ -69,7 +73,7 @@ def history_hint(turns: List[Dict]) -> str:
     if not turns:
         return ""
     latest = turns[0]
-    return _re.sub(r"\s+", " ", latest.get("query_text", "") or "").strip()
+    return _WS_RE.sub(" ", latest.get("query_text", "") or "").strip()
 
 def compute_history_budget_tokens(
     ctx_tokens: int = MODEL_CONTEXT_TOKENS,
@@ -118,8 +122,7 @@ def select_and_compact_history_messages(
     for q, a in pairs_oldest_first:
         cq = compact(q, per_turn_soft_cap_chars)
         ca = compact(a, per_turn_soft_cap_chars)
-        chunk = cq + ca
-        need = len(chunk)
+        need = len(cq) + len(ca)
         if used_chars + need > total_budget_chars and packed:
             break
         packed.append((cq, ca))
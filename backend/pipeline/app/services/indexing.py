@@ -22,44 +22,55 @@ WebSocket Events:
             {"phase": "embedding", "event": "start|progress|complete|error",
              "processed": int, "total": int, "progress": int?}
         Indexing phase:
-            {"phase": "indexing", "event": "start|progress|complete|file_indexed|error",
-             "processed": int, "total": int, "progress": int?, "path": str?}
+            {"phase": "indexing", "event": "start|progress|complete|error",
+             "processed": int, "total": int, "progress": int?}
+            {"phase": "indexing", "event": "file_indexed", "files": [str, ...]}
+        Progress events are sent at most every PROGRESS_MIN_INTERVAL seconds
+        per phase; start/complete/error are always sent.
         Final completion:
             {"phase": "indexed", "progress": 100}
         Fatal error:
             {"phase": "error", "message": str}
 
 Notes:
-    - Hidden paths (any path segment beginning with ".") are skipped.
+    - Hidden paths (any path segment beginning with ".") are skipped, as are
+      files larger than INDEX_MAX_FILE_BYTES (default 8 MiB).
     - Chunks are created by :func:`app.chunking.chunk_code`.
-    - Embeddings are produced by :class:`VoyageDocumentEmbedder`.
-    - Vector ANN index: :class:`PgvectorDocumentStore` (Haystack).
+    - Embeddings come straight from the `voyageai` async client; vectors are
+      cached in `embedding_cache` by (model, sha1(content)) and reused on re-index.
+    - Vector ANN index: :class:`PgvectorDocumentStore` (Haystack) owns the
+      table; rows are bulk-loaded with COPY. When the table starts empty, the
+      HNSW index is built once after the load.
     - Relational mirror: inserts into `documents` and `document_chunks`.
 """
 
 import os
+import mmap
+import time
+import random
 import hashlib
 import logging
 import asyncio
-from threading import Thread, Event
-from typing import List, Any, Optional, Set, Dict, Tuple
-from uuid import UUID
+import contextvars
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from typing import Iterator, List, Any, Optional, Set, Dict, Tuple, Union
 
 from psycopg.types.json import Json
 
+import voyageai
 from haystack import Document
 from haystack.utils import Secret
-from haystack.document_stores.types import DuplicatePolicy
 from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
-from haystack_integrations.components.embedders.voyage_embedders import (
-    VoyageDocumentEmbedder,
-)
 
-from app.services.file_utils import list_files
+from app.services.file_utils import list_files_with_stat, normalize_newlines
 from app.services.ws import _broadcast
 from app.chunking import chunk_code
+from app.services.languages import EXTENSION_TO_LANGUAGE, extension_to_language, warm_parsers
 
-from app.db import fetch_one, execute
+from app.db import fetch_one, fetch_all, execute, execute_many, transaction
 from app.routes.repos import mark_repo_indexed
 from app.config import (
     EMBEDDINGS_INDEX,
@@ -68,37 +79,144 @@ from app.config import (
 
 logger = logging.getLogger(__name__)
 
+# Embedding batches sent to VoyageAI concurrently per indexing run.
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+
+# Concurrent file reads (and paths per group) in the chunking pre-pass.
+FILE_READ_WORKERS = 32
+FILE_READ_GROUP = 256
+
+# Files above INDEX_MAX_FILE_BYTES (generated/vendored blobs) are skipped;
+# files from MMAP_MIN_BYTES up are decoded straight from a read-only mapping.
+INDEX_MAX_FILE_BYTES = int(os.getenv("INDEX_MAX_FILE_BYTES", str(8 * 1024 * 1024)))
+MMAP_MIN_BYTES = 1024 * 1024
+
+# Chunking processes; repos with fewer files than CHUNK_POOL_MIN_FILES chunk inline.
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_POOL_MIN_FILES = 64
+
+# Minimum seconds between "progress" broadcasts for one phase.
+PROGRESS_MIN_INTERVAL = 0.1
+
+HNSW_INDEX_NAME = "haystack_hnsw_index"
+# maintenance_work_mem for the one-shot HNSW build after a bulk load.
+HNSW_BUILD_WORK_MEM = os.getenv("HNSW_BUILD_WORK_MEM", "1GB")
+# Serves the per-repo filter + ORDER BY id in /repos/list_documents.
+REPO_META_INDEX_NAME = f"{EMBEDDINGS_INDEX}_repo_id_idx"
+
 def _chunk_text(chunk: Any) -> str:
     """Normalize a chunk-like object to a text string."""
-    if isinstance(chunk, str):
-        return chunk.strip()
     if isinstance(chunk, dict):
-        for key in ("content", "text", "code", "chunk", "body", "value"):
+        # chunk_code always emits "content"; the other keys cover foreign shapes.
+        val = chunk.get("content")
+        if isinstance(val, str):
+            val = val.strip()
+            if val:
+                return val
+        for key in ("text", "code", "chunk", "body", "value"):
             val = chunk.get(key)
             if isinstance(val, str) and val.strip():
                 return val.strip()
+        return ""
+    if isinstance(chunk, str):
+        return chunk.strip()
     return ""
 
 
-def _is_hidden_path(rel_path: str) -> bool:
-    """Whether any path segment starts with a dot ('.')."""
-    parts = rel_path.replace("\\", "/").split("/")
-    return any(p.startswith(".") for p in parts if p)
+def _sha1(data: Union[str, bytes]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data, usedforsecurity=False).hexdigest()
+
 
+def _read_text(abs_path: str) -> Optional[Tuple[str, str]]:
+    """(text, sha1 of the raw bytes) for a UTF-8 file, or None if unreadable or too big.
+
+    Large files are hashed and decoded from an mmap, so no intermediate
+    `bytes` copy of the whole file is made. Newlines are normalized after
+    decoding, matching `utils._read_source`.
+    """
+    try:
+        with open(abs_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > INDEX_MAX_FILE_BYTES:
+                return None
+            if size < MMAP_MIN_BYTES:
+                raw = f.read()
+                text, digest = raw.decode("utf-8"), _sha1(raw)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    text, digest = str(mm, "utf-8"), hashlib.sha1(mm, usedforsecurity=False).hexdigest()
+    except Exception:
+        return None
+    return normalize_newlines(text), digest
 
-def _sha1(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
+def _load_all_files(repo_path: str) -> List[Tuple[str, str, str, str]]:
+    """(rel_path, abs_path, text, file_sha) for every readable, non-hidden file in the repo.
+
+    Empty and oversized files are dropped from the scandir listing before any
+    read. Reads are I/O-bound, so they run FILE_READ_WORKERS at a time in
+    groups of FILE_READ_GROUP paths; output keeps listing order.
+    """
+    paths = [
+        (rel_path, abs_path)
+        for rel_path, abs_path, _, size in list_files_with_stat(repo_path)
+        if 0 < size <= INDEX_MAX_FILE_BYTES
+    ]
+    out: List[Tuple[str, str, str, str]] = []
+    with ThreadPoolExecutor(max_workers=FILE_READ_WORKERS, thread_name_prefix="read") as pool:
+        # Small repos chunk in this process; build their parsers while files load.
+        if len(paths) < CHUNK_POOL_MIN_FILES:
+            pool.submit(warm_parsers, {extension_to_language(rel) for rel, _ in paths} - {None})
+        for i in range(0, len(paths), FILE_READ_GROUP):
+            group = paths[i: i + FILE_READ_GROUP]
+            reads = pool.map(_read_text, [abs_path for _, abs_path in group])
+            out.extend(
+                (rel, abs_path, r[0], r[1]) for (rel, abs_path), r in zip(group, reads) if r is not None
+            )
+    return out
 
-def _json_safe(obj: Any) -> Any:
-    """Make objects JSON-serializable for Haystack meta payloads."""
-    if isinstance(obj, UUID):
-        return str(obj)
-    if isinstance(obj, dict):
-        return {k: _json_safe(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple)):
-        return [_json_safe(v) for v in obj]
-    return obj
+
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+_chunk_pool_lock = Lock()
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    """Process pool for tree-sitter chunking, shared across indexing runs.
+
+    Uses spawn so workers don't inherit the server's threads and locks; each
+    worker builds every known parser at startup and keeps them cached.
+    """
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ProcessPoolExecutor(
+                max_workers=CHUNK_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_parsers,
+                initargs=(sorted(set(EXTENSION_TO_LANGUAGE.values())),),
+            )
+        return _chunk_pool
+
+
+def _chunk_files(
+    files: List[Tuple[str, str, str, str]],
+    max_chars: int,
+    overlap: int,
+) -> Iterator[List[Dict[str, Any]]]:
+    """`chunk_code` output per file, in input order; large repos fan out to processes."""
+    if len(files) < CHUNK_POOL_MIN_FILES:
+        return (chunk_code(rel, text, max_chars=max_chars, overlap=overlap) for rel, _, text, _ in files)
+    n = len(files)
+    return _get_chunk_pool().map(
+        chunk_code,
+        [rel for rel, _, _, _ in files],
+        [text for _, _, text, _ in files],
+        [max_chars] * n,
+        [overlap] * n,
+        chunksize=16,
+    )
 
 
 async def _get_or_create_document(
@@ -127,16 +245,26 @@ async def _get_or_create_document(
             "DELETE FROM document_chunks WHERE document_id = %(doc_id)s",
             {"doc_id": sel["id"]},
         )
+        # Only write when something changes; metadata is re-merged only when
+        # the file moved, so re-indexing doesn't rewrite the TOASTed JSONB.
         await execute(
             """
             UPDATE documents
             SET ingestion_status = 'indexing',
                 ingested_at = NULL,
-                metadata = metadata || %(meta)s::jsonb
+                metadata = CASE
+                    WHEN metadata->>'source_uri' IS DISTINCT FROM %(source_uri)s
+                    THEN metadata || %(meta)s::jsonb
+                    ELSE metadata
+                END
             WHERE id = %(id)s
+              AND (ingestion_status <> 'indexing'
+                   OR ingested_at IS NOT NULL
+                   OR metadata->>'source_uri' IS DISTINCT FROM %(source_uri)s)
             """,
             {
                 "id": sel["id"],
+                "source_uri": abs_path,
                 "meta": Json({
                     "repo_id": repo_id,
                     "filename": rel_path,
@@ -173,7 +301,93 @@ async def _get_or_create_document(
     return str(ins["id"])
 
 
-async def _insert_chunk_row(
+async def _upsert_documents(repo_id: str, files: List[Tuple[str, str]]) -> Dict[str, str]:
+    """Bulk `_get_or_create_document` for (rel_path, abs_path) pairs in one statement.
+
+    Existing rows are reset to 'indexing' (skipped when already so) and their
+    old chunks deleted; missing ones are inserted. Returns {rel_path: document_id}.
+    """
+    if not files:
+        return {}
+    rows = await fetch_all(
+        """
+        WITH input AS (
+            SELECT * FROM unnest(%(titles)s::text[], %(uris)s::text[]) AS t(title, uri)
+        ),
+        existing AS (
+            SELECT DISTINCT ON (d.title) d.id, d.title
+            FROM documents d
+            JOIN input i ON i.title = d.title
+            WHERE d.repo_id = %(repo_id)s
+            ORDER BY d.title, d.created_at
+        ),
+        purged AS (
+            DELETE FROM document_chunks dc
+            USING existing e
+            WHERE dc.document_id = e.id
+        ),
+        updated AS (
+            UPDATE documents d
+            SET ingestion_status = 'indexing',
+                ingested_at = NULL,
+                metadata = CASE
+                    WHEN d.metadata->>'source_uri' IS DISTINCT FROM i.uri
+                    THEN d.metadata || jsonb_build_object(
+                        'repo_id', %(repo_id)s::text, 'filename', i.title, 'source_uri', i.uri
+                    )
+                    ELSE d.metadata
+                END
+            FROM existing e
+            JOIN input i ON i.title = e.title
+            WHERE d.id = e.id
+              AND (d.ingestion_status <> 'indexing'
+                   OR d.ingested_at IS NOT NULL
+                   OR d.metadata->>'source_uri' IS DISTINCT FROM i.uri)
+        ),
+        inserted AS (
+            INSERT INTO documents (
+                repo_id, title, description, source_type, source_uri,
+                version, checksum, ingestion_status, metadata
+            )
+            SELECT
+                %(repo_id)s, i.title, NULL, 'file', i.uri,
+                1, NULL, 'indexing',
+                jsonb_build_object('repo_id', %(repo_id)s::text, 'filename', i.title, 'source_uri', i.uri)
+            FROM input i
+            WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.title = i.title)
+            RETURNING id, title
+        )
+        SELECT id, title FROM existing
+        UNION ALL
+        SELECT id, title FROM inserted
+        """,
+        {
+            "repo_id": repo_id,
+            "titles": [rel for rel, _ in files],
+            "uris": [abs_path for _, abs_path in files],
+        },
+    )
+    return {r["title"]: str(r["id"]) for r in rows}
+
+
+_INSERT_CHUNK_SQL = """
+    INSERT INTO document_chunks (
+        document_id, chunk_text, chunk_hash, chunk_index,
+        start_offset, end_offset,
+        embedding, embedding_model, embedding_created_at,
+        embedding_metadata, token_count, metadata
+    )
+    VALUES (
+        %(document_id)s, %(chunk_text)s, %(chunk_hash)s, %(chunk_index)s,
+        NULL, NULL,
+        %(embedding)s, %(embedding_model)s, NOW(),
+        %(embedding_metadata)s, NULL,
+        %(metadata)s
+    )
+"""
+
+
+def _chunk_row(
     document_id: str,
     content: str,
     chunk_index: int,
@@ -181,39 +395,64 @@ async def _insert_chunk_row(
     end_line: Optional[int],
     embedding: Optional[List[float]],
     embedding_model: Optional[str],
-) -> None:
-    """Insert one row into document_chunks (embedding may be None)."""
-    await execute(
+    file_sha: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Bind parameters for one document_chunks row (embedding may be None).
+
+    With the source file's sha1 the chunk hash is `<file_sha>:<start>-<end>`
+    (line span), stable across re-indexes of an unchanged file and free to
+    compute.
+    """
+    return {
+        "document_id": document_id,
+        "chunk_text": content,
+        "chunk_hash": (
+            f"{file_sha}:{start_line}-{end_line}"
+            if file_sha and start_line is not None
+            else _sha1(f"{document_id}:{chunk_index}:{len(content)}")
+        ),
+        "chunk_index": chunk_index,
+        "embedding": embedding,
+        "embedding_model": embedding_model,
+        "embedding_metadata": Json({}),
+        "metadata": Json({
+            "start_line": start_line,
+            "end_line": end_line,
+        }),
+    }
+
+
+async def _insert_chunks_bulk(rows: List[Dict[str, Any]]) -> None:
+    """Insert a batch of document_chunks rows (see `_chunk_row`) in one round-trip."""
+    if rows:
+        await execute_many(_INSERT_CHUNK_SQL, rows)
+
+
+async def _cached_embeddings(model: str, hashes: List[str]) -> Dict[str, List[float]]:
+    """chunk_hash -> embedding for hashes already embedded with `model`."""
+    if not hashes:
+        return {}
+    rows = await fetch_all(
         """
-        INSERT INTO document_chunks (
-            document_id, chunk_text, chunk_hash, chunk_index,
-            start_offset, end_offset, search_vector,
-            embedding, embedding_model, embedding_created_at,
-            embedding_metadata, token_count, metadata
-        )
-        VALUES (
-            %(document_id)s, %(chunk_text)s, %(chunk_hash)s, %(chunk_index)s,
-            NULL, NULL,
-            to_tsvector('english', %(chunk_text)s),
-            %(embedding)s, %(embedding_model)s, NOW(),
-            %(embedding_metadata)s, NULL,
-            %(metadata)s
-        )
+        SELECT chunk_hash, embedding::real[] AS embedding
+        FROM embedding_cache
+        WHERE model = %(model)s AND chunk_hash = ANY(%(hashes)s)
         """,
-        {
-            "document_id": document_id,
-            "chunk_text": content,
-            "chunk_hash": _sha1(f"{document_id}:{chunk_index}:{len(content)}"),
-            "chunk_index": chunk_index,
-            "embedding": embedding,                 
-            "embedding_model": embedding_model,
-            "embedding_metadata": Json({}),         
-            "metadata": Json({                      
-                "start_line": start_line,
-                "end_line": end_line,
-            }),
-        },
+        {"model": model, "hashes": hashes},
     )
+    return {r["chunk_hash"]: list(r["embedding"]) for r in rows}
+
+
+async def _store_cached_embeddings(model: str, items: List[Tuple[str, List[float]]]) -> None:
+    if items:
+        await execute_many(
+            """
+            INSERT INTO embedding_cache (model, chunk_hash, embedding)
+            VALUES (%(model)s, %(h)s, %(e)s::real[]::halfvec)
+            ON CONFLICT DO NOTHING
+            """,
+            [{"model": model, "h": h, "e": e} for h, e in items],
+        )
 
 
 async def _finalize_document(doc_id: str) -> None:
@@ -228,6 +467,87 @@ async def _finalize_document(doc_id: str) -> None:
     )
 
 
+async def _embeddings_table_empty() -> bool:
+    """Whether the pgvector table is missing or has no rows yet."""
+    row = await fetch_one("SELECT to_regclass(%(t)s) IS NOT NULL AS present", {"t": EMBEDDINGS_INDEX})
+    if not row or not row["present"]:
+        return True
+    row = await fetch_one(f'SELECT EXISTS (SELECT 1 FROM "{EMBEDDINGS_INDEX}") AS found')
+    return not (row and row["found"])
+
+
+async def _copy_embeddings(docs: List[Document]) -> None:
+    """Upsert `docs` into the pgvector table via COPY into a temp table.
+
+    Same end state as `write_documents(..., DuplicatePolicy.OVERWRITE)` for
+    the id/content/meta/embedding columns, without one INSERT per row.
+    """
+    async with transaction() as conn, conn.cursor() as cur:
+        await cur.execute(
+            """
+            CREATE TEMP TABLE embeddings_load (
+                id text, content text, meta jsonb, embedding float8[]
+            ) ON COMMIT DROP
+            """,
+            prepare=False,
+        )
+        async with cur.copy(
+            "COPY embeddings_load (id, content, meta, embedding) FROM STDIN"
+        ) as copy:
+            for d in docs:
+                await copy.write_row((d.id, d.content, Json(d.meta or {}), d.embedding))
+        await cur.execute(
+            f"""
+            INSERT INTO "{EMBEDDINGS_INDEX}" (id, content, meta, embedding)
+            SELECT id, content, meta, embedding::vector FROM embeddings_load
+            ON CONFLICT (id) DO UPDATE
+            SET content = EXCLUDED.content,
+                meta = EXCLUDED.meta,
+                embedding = EXCLUDED.embedding
+            """,
+            prepare=False,
+        )
+
+
+async def _drop_hnsw_index() -> None:
+    await execute(f'DROP INDEX IF EXISTS "{HNSW_INDEX_NAME}"')
+
+
+async def _build_hnsw_index() -> None:
+    """Build the HNSW index in one pass; same definition Haystack would create."""
+    await execute(
+        f"""
+        BEGIN;
+        SET LOCAL maintenance_work_mem = '{HNSW_BUILD_WORK_MEM}';
+        CREATE INDEX IF NOT EXISTS "{HNSW_INDEX_NAME}" ON "{EMBEDDINGS_INDEX}"
+          USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 200);
+        COMMIT;
+        """,
+        prepare=False,
+    )
+
+
+async def _ensure_repo_meta_index() -> None:
+    """Index the pgvector table by (meta->>'repo_id', id); same as migration 0010."""
+    await execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS "{REPO_META_INDEX_NAME}" ON "{EMBEDDINGS_INDEX}"
+          ((meta->>'repo_id'), id)
+        """,
+        prepare=False,
+    )
+
+
+@lru_cache(maxsize=1)
+def _voyage_client() -> "voyageai.AsyncClient":
+    """Shared async VoyageAI client; reads VOYAGE_API_KEY from the environment."""
+    return voyageai.AsyncClient()
+
+
+# Strong references to running indexing tasks; the loop only keeps weak ones.
+_index_tasks: Set["asyncio.Task[None]"] = set()
+
+
 def index_repo(
     repo_path: str,
     repo_id: str,
@@ -235,7 +555,10 @@ def index_repo(
     max_chars: int = 10_000,
     overlap: int = 200,
 ) -> None:
-    """Index a repository into pgvector & relational tables.
+    """Start indexing a repository into pgvector & relational tables.
+
+    The work runs as a task on the running event loop and this call returns
+    immediately. Without a running loop it runs to completion instead.
 
     Args:
         repo_path: Absolute path to the repository on disk.
@@ -244,304 +567,407 @@ def index_repo(
         max_chars: Max characters per chunk.
         overlap: Overlap characters between adjacent chunks.
     """
+    coro = _index_repo_async(repo_path, repo_id, batch_size, max_chars, overlap)
     try:
         loop = asyncio.get_running_loop()
     except RuntimeError:
-        loop = asyncio.get_event_loop()
-
-    all_chunks: List[Dict[str, Any]] = []
-    for rel_path in list_files(repo_id):
-        if _is_hidden_path(rel_path):
-            continue
-
-        abs_path = os.path.join(repo_path, rel_path)
-        try:
-            with open(abs_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except Exception:
-            continue
-
-        for raw in chunk_code(rel_path, text, max_chars=max_chars, overlap=overlap):
-            content = _chunk_text(raw)
-            if not content:
-                continue
-            s_line = raw.get("start_line") if isinstance(raw, dict) else None
-            e_line = raw.get("end_line") if isinstance(raw, dict) else None
-            all_chunks.append(
-                {
-                    "filename": rel_path,
-                    "abs_path": abs_path,
-                    "content": content,
-                    "start_line": s_line,
-                    "end_line": e_line,
-                }
-            )
+        asyncio.run(coro)
+        return
+    # A fresh context keeps the task off any connection the caller pinned with
+    # connection_scope, which goes back to the pool when that scope exits.
+    task = loop.create_task(coro, name=f"indexer-{repo_id[:6]}", context=contextvars.Context())
+    _index_tasks.add(task)
+    task.add_done_callback(_index_tasks.discard)
 
-    total_chunks = len(all_chunks)
 
-    if total_chunks == 0:
-        _broadcast(repo_id, {
-            "phase": "embedding",
-            "event": "complete",
-            "processed": 0,
-            "total": 0,
-            "progress": 100,
-        })
-        _broadcast(repo_id, {
-            "phase": "indexing",
-            "event": "complete",
-            "processed": 0,
-            "total": 0,
-            "progress": 100,
-        })
-        _broadcast(repo_id, {"phase": "indexed", "progress": 100})
-        try:
-            asyncio.run_coroutine_threadsafe(mark_repo_indexed(repo_id), loop)
-        except Exception:
-            logger.exception("Failed to mark repo indexed for repo_id=%s", repo_id)
-        return
+async def _index_repo_async(
+    repo_path: str,
+    repo_id: str,
+    batch_size: int,
+    max_chars: int,
+    overlap: int,
+) -> None:
+    """Read, chunk, embed and index the repo; see :func:`index_repo`.
 
-    _broadcast(repo_id, {
-        "phase": "embedding",
-        "event": "start",
-        "processed": 0,
-        "total": total_chunks,
-        "progress": 0,
-    })
-    _broadcast(repo_id, {
-        "phase": "indexing",
-        "event": "start",
-        "processed": 0,
-        "total": total_chunks,
-        "progress": 0,
-    })
-
-    embedder = VoyageDocumentEmbedder(
-        model=VOYAGE_EMBED_MODEL,
-        input_type="document",
-    )
-    try:
-        embedder.warm_up()
-    except Exception:
-        pass
+    DB helpers and VoyageAI calls are awaited directly on the loop; file
+    reads, chunking and pgvector writes run in executors.
+    """
+    all_chunks: List[Dict[str, Any]] = []
+    total_chunks = 0
 
-    ready = Event()
-    ready.set()
+    client = _voyage_client()
 
     store: Optional[PgvectorDocumentStore] = None
+    # On a first load into an empty table, build HNSW once at the end instead
+    # of paying per-row graph inserts. Other repos' searches rely on the index,
+    # so a populated table keeps it and inserts incrementally.
+    defer_hnsw = False
 
     sent_files: Set[str] = set()
     doc_id_cache: Dict[str, str] = {}
+    file_sha_by_path: Dict[str, str] = {}
+    # sha1(content) -> occurrences not yet embedded, and the vectors of those
+    # still awaiting a later duplicate. A vector is dropped after its last use.
+    pending_dupes: Dict[str, int] = {}
+    run_vectors: Dict[str, List[float]] = {}
     finalized_docs: Set[str] = set()
 
     embed_done = 0
     index_done = 0
     last_emb_pct: Optional[int] = None
     last_idx_pct: Optional[int] = None
+    last_sent_at: Dict[str, float] = {}
 
-    def _ensure_document_id(rel_path: str, abs_path: str) -> str:
-        """Sync call that schedules async _get_or_create_document and waits for result."""
+    def _maybe_broadcast(phase: str, processed: int) -> Optional[int]:
+        """Send a progress event unless one went out for `phase` very recently.
+
+        Returns the percentage sent, or None when throttled.
+        """
+        now = time.monotonic()
+        if now - last_sent_at.get(phase, 0.0) < PROGRESS_MIN_INTERVAL:
+            return None
+        last_sent_at[phase] = now
+        pct = int(processed * 100 / max(1, total_chunks))
+        _broadcast(repo_id, {
+            "phase": phase,
+            "event": "progress",
+            "processed": processed,
+            "total": total_chunks,
+            "progress": pct,
+        })
+        return pct
+
+    async def _ensure_document_id(rel_path: str, abs_path: str) -> str:
         if rel_path in doc_id_cache:
             return doc_id_cache[rel_path]
-        fut = asyncio.run_coroutine_threadsafe(
-            _get_or_create_document(repo_id, rel_path, abs_path),
-            loop,
-        )
-        doc_id = str(fut.result())
+        doc_id = str(await _get_or_create_document(repo_id, rel_path, abs_path))
         doc_id_cache[rel_path] = doc_id
         return doc_id
 
-    def _insert_chunk_sync(
-        document_id: str,
-        content: str,
-        chunk_index: int,
-        start_line: Optional[int],
-        end_line: Optional[int],
-        embedding: Optional[List[float]],
-        embedding_model: Optional[str],
-    ) -> None:
-        fut = asyncio.run_coroutine_threadsafe(
-            _insert_chunk_row(
-                document_id=document_id,
-                content=content,
-                chunk_index=chunk_index,
-                start_line=start_line,
-                end_line=end_line,
-                embedding=embedding,
-                embedding_model=embedding_model,
-            ),
-            loop,
-        )
-        fut.result()
-
-    def _finalize_document_sync(doc_id: str) -> None:
-        if doc_id in finalized_docs:
-            return
-        fut = asyncio.run_coroutine_threadsafe(_finalize_document(doc_id), loop)
-        fut.result()
-        finalized_docs.add(doc_id)
-
-    def _worker():
-        """Background worker that performs embedding and indexing."""
-        nonlocal store, embed_done, index_done, last_emb_pct, last_idx_pct
-
-        try:
-            for start in range(0, total_chunks, batch_size):
-                batch = all_chunks[start: start + batch_size]
+    async def _collect_chunks() -> None:
+        nonlocal total_chunks
+        files = await asyncio.to_thread(_load_all_files, repo_path)
+        chunked = await asyncio.to_thread(lambda: list(_chunk_files(files, max_chars, overlap)))
+        for (rel_path, abs_path, _, file_sha), raws in zip(files, chunked):
+            file_sha_by_path[rel_path] = file_sha
+            for raw in raws:
+                content = _chunk_text(raw)
+                if not content:
+                    continue
+                s_line = raw.get("start_line") if isinstance(raw, dict) else None
+                e_line = raw.get("end_line") if isinstance(raw, dict) else None
+                h = _sha1(content)
+                pending_dupes[h] = pending_dupes.get(h, 0) + 1
+                all_chunks.append(
+                    {
+                        "filename": rel_path,
+                        "abs_path": abs_path,
+                        "content": content,
+                        "start_line": s_line,
+                        "end_line": e_line,
+                    }
+                )
+        total_chunks = len(all_chunks)
+        # Unique content never needs a per-run vector.
+        for h in [h for h, n in pending_dupes.items() if n == 1]:
+            del pending_dupes[h]
+
+        # One round-trip for every documents row instead of one per file.
+        doc_files = list(dict.fromkeys((c["filename"], c["abs_path"]) for c in all_chunks))
+        doc_id_cache.update(await _upsert_documents(repo_id, doc_files))
+
+    async def _prepare_batch(start: int) -> List[Document]:
+        """Documents (with relational ids in meta) for all_chunks[start:start + batch_size]."""
+        batch = all_chunks[start: start + batch_size]
+
+        docs: List[Document] = []
+        for local_idx, item in enumerate(batch):
+            # Already normalized (stripped, non-empty) by _collect_chunks.
+            content = item["content"]
+            rel_path = item["filename"]
+            abs_path = item["abs_path"]
+            s_line = item.get("start_line")
+            e_line = item.get("end_line")
+
+            doc_id = await _ensure_document_id(rel_path, abs_path)
+
+            suffix = (
+                f"{s_line}-{e_line}"
+                if isinstance(s_line, int) and isinstance(e_line, int)
+                else f"{start + local_idx}"
+            )
 
-                docs: List[Document] = []
-                mapping: List[Tuple[int, Dict[str, Any]]] = []
+            # All values are already str/int/None, so the meta is JSON-safe as built.
+            meta = {
+                "filename": rel_path,
+                "repo_id": repo_id,
+                "repoId": repo_id,
+                "start_line": s_line,
+                "end_line": e_line,
+                "document_id": str(doc_id),
+                "chunk_index": start + local_idx,
+            }
+
+            docs.append(
+                Document(
+                    id=f"{repo_id}:{rel_path}:{suffix}",
+                    content=content,
+                    meta=meta,
+                )
+            )
 
-                for local_idx, item in enumerate(batch):
-                    content = _chunk_text(item.get("content"))
-                    if not content:
-                        continue
+        return docs
+
+    async def _embed_batch(docs: List[Document]) -> List[Document]:
+        """Embed `docs`, reusing vectors for content already seen in this run or cached."""
+        hashes = [_sha1(d.content or "") for d in docs]
+        known: Dict[str, List[float]] = {h: run_vectors[h] for h in hashes if h in run_vectors}
+        missing = [h for h in dict.fromkeys(hashes) if h not in known]
+        if missing:
+            known.update(await _cached_embeddings(VOYAGE_EMBED_MODEL, missing))
+
+        # Embed each distinct unknown text once; duplicates share its vector.
+        first_of: Dict[str, int] = {}
+        for i, h in enumerate(hashes):
+            if h not in known:
+                first_of.setdefault(h, i)
+        todo = list(first_of.values())
+        if todo:
+            # Small jitter so concurrent batches don't hit the API in lockstep.
+            await asyncio.sleep(random.uniform(0, 0.05))
+            result = await client.embed(
+                [docs[i].content or "" for i in todo],
+                model=VOYAGE_EMBED_MODEL,
+                input_type="document",
+            )
+            new_items: List[Tuple[str, List[float]]] = []
+            for i, vec in zip(todo, result.embeddings):
+                if vec:
+                    docs[i].embedding = vec
+                    known[hashes[i]] = vec
+                    new_items.append((hashes[i], vec))
+            await _store_cached_embeddings(VOYAGE_EMBED_MODEL, new_items)
+
+        for i, h in enumerate(hashes):
+            if docs[i].embedding is None and h in known:
+                docs[i].embedding = known[h]
+        for h in hashes:
+            left = pending_dupes.get(h)
+            if left is None:
+                continue
+            if left > 1:
+                pending_dupes[h] = left - 1
+                if h in known:
+                    run_vectors[h] = known[h]
+            else:
+                del pending_dupes[h]
+                run_vectors.pop(h, None)
+        return docs
+
+    async def _store_batch(embedded_docs: List[Document]) -> None:
+        """Write one embedded batch to pgvector + document_chunks and report progress."""
+        nonlocal store, embed_done, index_done, last_emb_pct, last_idx_pct, defer_hnsw
+
+        embed_done += len(embedded_docs)
+        if int(embed_done * 100 / max(1, total_chunks)) != last_emb_pct:
+            sent = _maybe_broadcast("embedding", embed_done)
+            if sent is not None:
+                last_emb_pct = sent
+
+        if store is None:
+            first_emb = next(
+                (d.embedding for d in embedded_docs if getattr(d, "embedding", None)),
+                None,
+            )
+            if first_emb is None:
+                raise RuntimeError("Failed to obtain embedding from first batch")
+            defer_hnsw = await _embeddings_table_empty()
+            if defer_hnsw:
+                await _drop_hnsw_index()
+            store = PgvectorDocumentStore(
+                connection_string=Secret.from_env_var("DATABASE_DSN"),
+                table_name=EMBEDDINGS_INDEX,
+                embedding_dimension=len(first_emb),
+                create_extension=True,
+                recreate_table=False,
+                search_strategy="exact_nearest_neighbor" if defer_hnsw else "hnsw",
+                hnsw_recreate_index_if_exists=False,
+                hnsw_index_creation_kwargs={"M": 16, "ef_construction": 200},
+                hnsw_index_name=HNSW_INDEX_NAME,
+                hnsw_ef_search=50,
+            )
 
-                    rel_path = item["filename"]
-                    abs_path = item["abs_path"]
-                    s_line = item.get("start_line")
-                    e_line = item.get("end_line")
+            # Creates the table (and HNSW index unless deferred) if missing.
+            await asyncio.to_thread(store.count_documents)
+            await _ensure_repo_meta_index()
+
+        await _copy_embeddings(embedded_docs)
+
+        just_indexed_files: Set[str] = set()
+        pending_rows: List[Dict[str, Any]] = []
+        for d in embedded_docs:
+            meta = getattr(d, "meta", {}) or {}
+            rel = meta.get("filename")
+            doc_id = meta.get("document_id")
+            chunk_index = meta.get("chunk_index")
+
+            pending_rows.append(_chunk_row(
+                document_id=str(doc_id),
+                content=d.content or "",
+                chunk_index=int(chunk_index) if chunk_index is not None else 0,
+                start_line=meta.get("start_line"),
+                end_line=meta.get("end_line"),
+                embedding=getattr(d, "embedding", None),
+                embedding_model=VOYAGE_EMBED_MODEL,
+                file_sha=file_sha_by_path.get(rel) if isinstance(rel, str) else None,
+            ))
+
+            if isinstance(rel, str):
+                just_indexed_files.add(rel)
+
+        await _insert_chunks_bulk(pending_rows)
+
+        new_files = [rel for rel in just_indexed_files if rel not in sent_files]
+        if new_files:
+            sent_files.update(new_files)
+            _broadcast(repo_id, {
+                "phase": "indexing",
+                "event": "file_indexed",
+                "files": new_files,
+            })
 
-                    doc_id = _ensure_document_id(rel_path, abs_path)
+        index_done += len(embedded_docs)
+        if int(index_done * 100 / max(1, total_chunks)) != last_idx_pct:
+            sent = _maybe_broadcast("indexing", index_done)
+            if sent is not None:
+                last_idx_pct = sent
 
-                    suffix = (
-                        f"{s_line}-{e_line}"
-                        if isinstance(s_line, int) and isinstance(e_line, int)
-                        else f"{start + local_idx}"
-                    )
+        for rel in just_indexed_files:
+            doc_id = doc_id_cache.get(rel)
+            if doc_id and doc_id not in finalized_docs:
+                await _finalize_document(doc_id)
+                finalized_docs.add(doc_id)
 
-                    meta = _json_safe({
-                        "filename": rel_path,
-                        "repo_id": repo_id,
-                        "repoId": repo_id,
-                        "start_line": s_line,
-                        "end_line": e_line,
-                        "document_id": str(doc_id),
-                        "chunk_index": start + local_idx,
-                    })
-
-                    docs.append(
-                        Document(
-                            id=f"{repo_id}:{rel_path}:{suffix}",
-                            content=content,
-                            meta=meta,
-                        )
-                    )
-                    mapping.append((start + local_idx, item))
+    async def _run_batches() -> None:
+        """Embed up to EMBED_MAX_IN_FLIGHT batches at once and store them in order.
 
-                if not docs:
-                    continue
+        The producer schedules embedding tasks into a bounded queue; the writer
+        awaits them in submission order, so DB writes overlap embedding.
+        """
+        store_q: "asyncio.Queue[Optional[asyncio.Task[List[Document]]]]" = asyncio.Queue(
+            maxsize=EMBED_MAX_IN_FLIGHT
+        )
+        slots = asyncio.Semaphore(EMBED_MAX_IN_FLIGHT)
 
-                ready.wait()
-
-                pipe_out = embedder.run(docs)
-                embedded_docs: List[Document] = pipe_out["documents"]
-
-                embed_done += len(embedded_docs)
-                emb_pct = int(embed_done * 100 / max(1, total_chunks))
-                if emb_pct != last_emb_pct:
-                    last_emb_pct = emb_pct
-                    _broadcast(repo_id, {
-                        "phase": "embedding",
-                        "event": "progress",
-                        "processed": embed_done,
-                        "total": total_chunks,
-                        "progress": emb_pct,
-                    })
-
-                if store is None:
-                    first_emb = next(
-                        (d.embedding for d in embedded_docs if getattr(d, "embedding", None)),
-                        None,
-                    )
-                    if first_emb is None:
-                        raise RuntimeError("Failed to obtain embedding from first batch")
-                    store = PgvectorDocumentStore(
-                        connection_string=Secret.from_env_var("DATABASE_DSN"),
-                        table_name=EMBEDDINGS_INDEX,
-                        embedding_dimension=len(first_emb),
-                        create_extension=True,
-                        recreate_table=False,
-                        search_strategy="hnsw",
-                        hnsw_recreate_index_if_exists=False,
-                        hnsw_index_creation_kwargs={"M": 16, "ef_construction": 200},
-                        hnsw_index_name="haystack_hnsw_index",
-                        hnsw_ef_search=50,
-                    )
+        async def _embed_in_slot(docs: List[Document]) -> List[Document]:
+            try:
+                return await _embed_batch(docs)
+            finally:
+                slots.release()
 
-                store.write_documents(embedded_docs, policy=DuplicatePolicy.OVERWRITE)
-
-                just_indexed_files: Set[str] = set()
-                for d in embedded_docs:
-                    meta = getattr(d, "meta", {}) or {}
-                    rel = meta.get("filename")
-                    doc_id = meta.get("document_id")
-                    chunk_index = meta.get("chunk_index")
-
-                    _insert_chunk_sync(
-                        document_id=str(doc_id),
-                        content=d.content or "",
-                        chunk_index=int(chunk_index) if chunk_index is not None else 0,
-                        start_line=meta.get("start_line"),
-                        end_line=meta.get("end_line"),
-                        embedding=getattr(d, "embedding", None),
-                        embedding_model=VOYAGE_EMBED_MODEL,
-                    )
+        async def _producer() -> None:
+            try:
+                for start in range(0, total_chunks, batch_size):
+                    docs = await _prepare_batch(start)
+                    if not docs:
+                        continue
+                    await slots.acquire()
+                    await store_q.put(asyncio.create_task(_embed_in_slot(docs)))
+            finally:
+                await store_q.put(None)
+
+        async def _writer() -> None:
+            while True:
+                task = await store_q.get()
+                if task is None:
+                    return
+                await _store_batch(await task)
+
+        producer = asyncio.create_task(_producer())
+        try:
+            await _writer()
+            await producer
+        finally:
+            producer.cancel()
+            while not store_q.empty():
+                pending = store_q.get_nowait()
+                if pending is not None:
+                    pending.cancel()
 
-                    if isinstance(rel, str):
-                        just_indexed_files.add(rel)
-
-                for rel in sorted(just_indexed_files):
-                    if rel not in sent_files:
-                        sent_files.add(rel)
-                        _broadcast(repo_id, {
-                            "phase": "indexing",
-                            "event": "file_indexed",
-                            "path": rel,
-                        })
-
-                index_done += len(embedded_docs)
-                idx_pct = int(index_done * 100 / max(1, total_chunks))
-                if idx_pct != last_idx_pct:
-                    last_idx_pct = idx_pct
-                    _broadcast(repo_id, {
-                        "phase": "indexing",
-                        "event": "progress",
-                        "processed": index_done,
-                        "total": total_chunks,
-                        "progress": idx_pct,
-                    })
-
-                for rel in just_indexed_files:
-                    doc_id = doc_id_cache.get(rel)
-                    if doc_id:
-                        _finalize_document_sync(doc_id)
+    try:
+        await _collect_chunks()
 
+        if total_chunks == 0:
             _broadcast(repo_id, {
                 "phase": "embedding",
                 "event": "complete",
-                "processed": total_chunks,
-                "total": total_chunks,
+                "processed": 0,
+                "total": 0,
                 "progress": 100,
             })
             _broadcast(repo_id, {
                 "phase": "indexing",
                 "event": "complete",
-                "processed": total_chunks,
-                "total": total_chunks,
+                "processed": 0,
+                "total": 0,
                 "progress": 100,
             })
             _broadcast(repo_id, {"phase": "indexed", "progress": 100})
-
             try:
-                asyncio.run_coroutine_threadsafe(mark_repo_indexed(repo_id), loop)
+                await mark_repo_indexed(repo_id)
             except Exception:
                 logger.exception("Failed to mark repo indexed for repo_id=%s", repo_id)
+            return
+
+        _broadcast(repo_id, {
+            "phase": "embedding",
+            "event": "start",
+            "processed": 0,
+            "total": total_chunks,
+            "progress": 0,
+        })
+        _broadcast(repo_id, {
+            "phase": "indexing",
+            "event": "start",
+            "processed": 0,
+            "total": total_chunks,
+            "progress": 0,
+        })
 
-        except Exception as e:
-            logger.exception("Indexing failed for repo_id=%s", repo_id)
-            _broadcast(repo_id, {"phase": "embedding", "event": "error", "error": str(e)})
-            _broadcast(repo_id, {"phase": "indexing", "event": "error", "error": str(e)})
-            _broadcast(repo_id, {"phase": "error", "message": str(e)})
+        await _run_batches()
 
-    Thread(target=_worker, daemon=True, name=f"indexer-{repo_id[:6]}").start()
+        _broadcast(repo_id, {
+            "phase": "embedding",
+            "event": "complete",
+            "processed": total_chunks,
+            "total": total_chunks,
+            "progress": 100,
+        })
+        _broadcast(repo_id, {
+            "phase": "indexing",
+            "event": "complete",
+            "processed": total_chunks,
+            "total": total_chunks,
+            "progress": 100,
+        })
+
+        if defer_hnsw:
+            await _build_hnsw_index()
+
+        _broadcast(repo_id, {"phase": "indexed", "progress": 100})
+
+        try:
+            await mark_repo_indexed(repo_id)
+        except Exception:
+            logger.exception("Failed to mark repo indexed for repo_id=%s", repo_id)
+
+    except Exception as e:
+        logger.exception("Indexing failed for repo_id=%s", repo_id)
+        if defer_hnsw:
+            try:
+                await _build_hnsw_index()
+            except Exception:
+                logger.exception("Failed to build HNSW index after aborted load")
+        _broadcast(repo_id, {"phase": "embedding", "event": "error", "error": str(e)})
+        _broadcast(repo_id, {"phase": "indexing", "event": "error", "error": str(e)})
+        _broadcast(repo_id, {"phase": "error", "message": str(e)})
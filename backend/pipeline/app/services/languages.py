@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 import logging
+import threading
 from functools import lru_cache
-from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 from tree_sitter import Parser
 from tree_sitter_languages import get_language
@@ -32,26 +32,61 @@ EXTENSION_TO_LANGUAGE: dict[str, str] = {
     ".ql": "ql",
 }
 
+# Lowercase extension -> language; lookups lowercase the suffix once.
+_EXT: dict[str, str] = {k.lower(): v for k, v in EXTENSION_TO_LANGUAGE.items()}
+
+
+def _suffix(ext_or_path: str) -> str:
+    """Lowercase extension of a path (like `Path.suffix`), or the input if it is one."""
+    i = ext_or_path.rfind(".")
+    if i < 0:
+        return ""
+    sep = ext_or_path.rfind("/")
+    if i == 0 and sep < 0:
+        return ext_or_path.lower()
+    if i <= sep + 1:
+        return ""
+    return ext_or_path[i:].lower()
+
 def extension_to_language(ext_or_path: str) -> Optional[str]:
     """Return tree-sitter language name for a file extension or path."""
-    ext = ext_or_path
-    if not ext.startswith("."):
-        ext = Path(ext_or_path).suffix.lower()
-    return EXTENSION_TO_LANGUAGE.get(ext.lower())
+    return _EXT.get(_suffix(ext_or_path))
 
 @lru_cache(maxsize=None)
+def _load_language(language_name: str):
+    """Process-wide cache of loaded tree-sitter grammars (the expensive part)."""
+    return get_language(language_name)
+
+# Parsers are not thread-safe, so each thread keeps its own; they share the
+# loaded grammars.
+_local = threading.local()
+
 def get_parser(language_name: str) -> Optional[Parser]:
-    """Cached Parser for a tree-sitter language name."""
+    """Cached Parser for a tree-sitter language name (one per thread)."""
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    if language_name in parsers:
+        return parsers[language_name]
     try:
-        lang = get_language(language_name)
         p = Parser()
-        p.set_language(lang)
-        return p
+        p.set_language(_load_language(language_name))
     except Exception as exc:
         logging.warning("Failed to create parser for %s: %s", language_name, exc)
-        return None
+        p = None
+    parsers[language_name] = p
+    return p
+
+def warm_parsers(language_names: Iterable[str]) -> None:
+    """Load the grammars for `language_names` ahead of first use.
+
+    Also builds the calling thread's parsers; other threads then only pay
+    for a cheap `Parser()`.
+    """
+    for name in language_names:
+        get_parser(name)
 
 def get_parser_for_path(path: str) -> Optional[Parser]:
     """Get a cached Parser based on the file path’s extension."""
-    lang = extension_to_language(path)
+    lang = _EXT.get(_suffix(path))
     return get_parser(lang) if lang else None
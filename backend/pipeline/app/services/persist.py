@@ -1,25 +1,31 @@
 # app/services/persist.py
 
-import json
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional
 
+import orjson
+
 from app.db import fetch_one, execute
-from app.services.chunks import resolve_chunk_id
+from app.services.chunks import resolve_chunk_ids
 
-def append_local_history(repo_id: str, question: str, answer: str) -> None:
+def _repo_data_dir(repo_id: str) -> Path:
+    # Not cached: delete_repo removes the directory, and the next append
+    # must recreate it.
     repo_dir = Path("data") / "repos" / repo_id
     repo_dir.mkdir(parents=True, exist_ok=True)
-    hist_file = repo_dir / "queries.json"
-    history = json.loads(hist_file.read_text(encoding="utf-8")) if hist_file.exists() else []
-    history.append({
+    return repo_dir
+
+def append_local_history(repo_id: str, question: str, answer: str) -> None:
+    """Append one entry to the repo's queries.jsonl (one JSON object per line)."""
+    line = orjson.dumps({
         "question": question,
         "answer": answer,
-        "timestamp": datetime.utcnow().isoformat(),
-    })
-    hist_file.write_text(json.dumps(history, indent=2), encoding="utf-8")
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }) + b"\n"
+    with open(_repo_data_dir(repo_id) / "queries.jsonl", "ab") as f:
+        f.write(line)
 
 async def persist_query_and_chunks(
     conversation_id: Optional[str],
@@ -41,7 +47,7 @@ async def persist_query_and_chunks(
                 "user_id": user_id,
                 "query_text": question,
                 "response_text": answer,
-                "response_metadata": json.dumps(response_metadata),
+                "response_metadata": orjson.dumps(response_metadata).decode(),
             },
         )
         if not rq or "id" not in rq:
@@ -50,30 +56,33 @@ async def persist_query_and_chunks(
         rag_query_id = rq["id"]
 
         try:
-            rank_counter = 1
-            for d in retrieved_docs:
-                meta = getattr(d, "meta", {}) or {}
-                content = getattr(d, "content", "") or ""
-                score = getattr(d, "score", None)
-
-                dc_id = await resolve_chunk_id(meta, content)
+            # Ranks count every retrieved doc, including ones that don't resolve.
+            dc_ids = await resolve_chunk_ids(
+                [getattr(d, "meta", {}) or {} for d in retrieved_docs]
+            )
+            dc_list, scores, ranks = [], [], []
+            for rank, (d, dc_id) in enumerate(zip(retrieved_docs, dc_ids), start=1):
                 if not dc_id:
-                    rank_counter += 1
                     continue
+                score = getattr(d, "score", None)
+                dc_list.append(dc_id)
+                scores.append(float(score) if isinstance(score, (int, float)) else None)
+                ranks.append(rank)
 
+            if dc_list:
                 await execute(
                     """
                     INSERT INTO retrieved_chunks (id, rag_query_id, document_chunk_id, score, rank, used_in_prompt, created_at)
-                    VALUES (gen_random_uuid(), %(rq_id)s, %(dc_id)s, %(score)s, %(rank)s, TRUE, now())
+                    SELECT gen_random_uuid(), %(rq_id)s, r.dc_id, r.score, r.rank, TRUE, now()
+                    FROM unnest(%(dc_ids)s::uuid[], %(scores)s::float8[], %(ranks)s::int[]) AS r(dc_id, score, rank)
                     """,
                     {
                         "rq_id": rag_query_id,
-                        "dc_id": dc_id,
-                        "score": float(score) if isinstance(score, (int, float)) else None,
-                        "rank": rank_counter,
+                        "dc_ids": dc_list,
+                        "scores": scores,
+                        "ranks": ranks,
                     },
                 )
-                rank_counter += 1
         except Exception as e_chunks:
             print("[warn] Failed to persist retrieved_chunks:", repr(e_chunks))
             traceback.print_exc()
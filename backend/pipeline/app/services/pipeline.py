@@ -1,5 +1,6 @@
 # app/services/pipeline.py
 
+import asyncio
 import json
 import traceback
 from typing import Dict, List, Tuple, Optional
@@ -13,19 +14,22 @@ from app.services.history import load_recent_history, render_history_md, history
 from app.services.prompts import system_rules, render_current_user_payload
 from app.services.chunks import rewrite_doc_numbers_to_filenames
 from app.services.persist import append_local_history, persist_query_and_chunks
-from app.db import fetch_one
+from app.db import connection_scope, fetch_one
 
 async def query_codebase(
     request: QueryRequest,
     filters: Optional[Dict] = None,
+    recent_turns: Optional[List[Dict]] = None,
 ) -> Tuple[str, List[Dict]]:
     """
     Run retrieval + LLM with history-aware chat and return (answer, contexts).
     Persists the turn into rag_queries + retrieved_chunks.
+    Pass `recent_turns` when the caller has already loaded the history.
     """
     pipe = build_retrieval_pipeline()
 
-    recent_turns = await load_recent_history(getattr(request, "conversationId", None), limit=6)
+    if recent_turns is None:
+        recent_turns = await load_recent_history(getattr(request, "conversationId", None), limit=6)
     history_md = render_history_md(recent_turns)
     hint = history_hint(recent_turns)
 
@@ -80,42 +84,43 @@ async def query_codebase(
 
     answer = rewrite_doc_numbers_to_filenames(answer, file_order)
 
-    append_local_history(request.repoId, request.question, answer)
+    await asyncio.to_thread(append_local_history, request.repoId, request.question, answer)
 
     try:
-        print(f"[dbg] conversationId={getattr(request, 'conversationId', None)} userId={getattr(request, 'userId', None)} repoId={request.repoId}")
-
-        conv_ok = False
-        conv_id_param: Optional[str] = None
-        conv_user_id: Optional[str] = None
-
-        if getattr(request, "conversationId", None):
-            conv_row = await fetch_one(
-                "SELECT id, user_id FROM conversations WHERE id = %(id)s",
-                {"id": request.conversationId},
+        async with connection_scope():
+            print(f"[dbg] conversationId={getattr(request, 'conversationId', None)} userId={getattr(request, 'userId', None)} repoId={request.repoId}")
+
+            conv_ok = False
+            conv_id_param: Optional[str] = None
+            conv_user_id: Optional[str] = None
+
+            if getattr(request, "conversationId", None):
+                conv_row = await fetch_one(
+                    "SELECT id, user_id FROM conversations WHERE id = %(id)s",
+                    {"id": request.conversationId},
+                )
+                if conv_row:
+                    conv_ok = True
+                    conv_id_param = conv_row["id"]
+                    conv_user_id = conv_row.get("user_id")
+
+            if not conv_ok and getattr(request, "conversationId", None):
+                print(f"[warn] conversationId {request.conversationId} not found; inserting rag_query with NULL conversation_id")
+
+            user_id_param: Optional[str] = getattr(request, "userId", None) or conv_user_id
+
+            await persist_query_and_chunks(
+                conversation_id=conv_id_param,
+                user_id=user_id_param,
+                question=request.question,
+                answer=answer,
+                retrieved_docs=retrieved,
+                response_metadata={
+                    "repo_id": request.repoId,
+                    "ranker_model": VOYAGE_RERANK_MODEL,
+                    "retrieved_count": len(retrieved),
+                },
             )
-            if conv_row:
-                conv_ok = True
-                conv_id_param = conv_row["id"]
-                conv_user_id = conv_row.get("user_id")
-
-        if not conv_ok and getattr(request, "conversationId", None):
-            print(f"[warn] conversationId {request.conversationId} not found; inserting rag_query with NULL conversation_id")
-
-        user_id_param: Optional[str] = getattr(request, "userId", None) or conv_user_id
-
-        await persist_query_and_chunks(
-            conversation_id=conv_id_param,
-            user_id=user_id_param,
-            question=request.question,
-            answer=answer,
-            retrieved_docs=retrieved,
-            response_metadata={
-                "repo_id": request.repoId,
-                "ranker_model": VOYAGE_RERANK_MODEL,
-                "retrieved_count": len(retrieved),
-            },
-        )
 
     except Exception as e:
         print("[warn] Failed to persist RAG query/chunks:", repr(e))
@@ -18,7 +18,6 @@ Overall status synthesis:
     or ``"unknown"``.
 """
 import asyncio
-import json
 import os
 import time
 from typing import Any, AsyncIterator, Dict, Optional
@@ -71,15 +70,16 @@ class ProgressBroker:
     async def subscribe(self, repo_id: str) -> AsyncIterator[Dict[str, Any]]:
         """Subscribe to progress updates for a repository.
 
-        Starts by yielding the current snapshot, then yields incremental updates
-        as they occur.
+        Starts by yielding the current snapshot, then yields a fresh snapshot
+        (same shape as :meth:`snapshot`) after updates occur. Updates that land
+        while the consumer is busy may be coalesced into a single snapshot.
 
         Args:
             repo_id: Repository identifier to subscribe to.
 
         Yields:
-            dict: A JSON-serializable payload representing either the initial
-            snapshot or a subsequent update event.
+            dict: A JSON-serializable snapshot, initially and after each batch
+            of updates.
         """
         raise NotImplementedError
 
@@ -87,13 +87,17 @@ class ProgressBroker:
 class InMemoryProgressBroker(ProgressBroker):
     """In-memory :class:`ProgressBroker` implementation.
 
-    Stores per-repo snapshots in-memory and fans out updates to per-repo queues
-    for subscribers. This is suitable for a single-process deployment.
+    Stores per-repo snapshots in-memory and wakes subscribers through one
+    :class:`asyncio.Condition` per repo. Subscribers re-read the snapshot on
+    wake, so a slow consumer sees coalesced (latest) state instead of backing
+    up a buffer. This is suitable for a single-process deployment.
     """
     def __init__(self) -> None:
         """Initialize the broker with empty state and a process-local lock."""
         self._snapshots: Dict[str, Dict[str, Any]] = {}
-        self._subs: Dict[str, set[asyncio.Queue]] = {}
+        self._conds: Dict[str, asyncio.Condition] = {}
+        self._subscribers: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
         self._lock = asyncio.Lock()
 
     def _mk_base(self, repo_id: str) -> Dict[str, Any]:
@@ -146,10 +150,10 @@ class InMemoryProgressBroker(ProgressBroker):
     async def update(self, repo_id: str, phase: str, status: str,
                      processed: Optional[int]=None, total: Optional[int]=None,
                      message: Optional[str]=None, error: Optional[str]=None) -> Dict[str, Any]:
-        """Record and broadcast a per-phase progress update.
+        """Record a per-phase progress update and wake subscribers.
 
-        Also recalculates the overall snapshot and pushes an event to all
-        subscribers for the given ``repo_id``.
+        Also recalculates the overall snapshot and notifies every subscriber
+        of ``repo_id``.
 
         Args:
             repo_id: Repository identifier.
@@ -180,29 +184,21 @@ class InMemoryProgressBroker(ProgressBroker):
             phases[phase] = cur
 
             snap.update(self._overall(phases))
+            self._versions[repo_id] = self._versions.get(repo_id, 0) + 1
 
-            payload = {
-                "type": "task_update",
-                "repoId": repo_id,
-                "phase": phase,
-                "status": status,
-                "processed": cur.get("processed"),
-                "total": cur.get("total"),
-                "progress": cur.get("progress"),
-                "message": message,
-                "error": error,
-                "event": "progress" if status == "running" else status,
-            }
-            for q in self._subs.get(repo_id, set()):
-                try: q.put_nowait(payload)
-                except: pass
-            return snap
+        # Notify after releasing the lock: one wake-up for all subscribers.
+        cond = self._conds.get(repo_id)
+        if cond is not None:
+            async with cond:
+                cond.notify_all()
+        return snap
 
     async def snapshot(self, repo_id: str) -> Dict[str, Any]:
         """Return a copied snapshot for ``repo_id``.
 
-        The snapshot is round-tripped through JSON to ensure it is
-        JSON-serializable and detached from internal references.
+        The snapshot is two levels deep (top-level keys, then one flat dict
+        of scalars per phase), so copying those two levels fully detaches it
+        from internal state.
 
         Args:
             repo_id: Repository identifier.
@@ -210,30 +206,50 @@ class InMemoryProgressBroker(ProgressBroker):
         Returns:
             dict: Current snapshot for the repository.
         """
-        async with self._lock:
-            return json.loads(json.dumps(self._snapshots.get(repo_id) or self._mk_base(repo_id)))
+        # No lock: updates mutate snapshots without awaiting, so on the single
+        # event loop a read never observes a half-applied update.
+        snap = self._snapshots.get(repo_id) or self._mk_base(repo_id)
+        return {**snap, "phases": {p: dict(v) for p, v in snap.get("phases", {}).items()}}
 
     async def subscribe(self, repo_id: str) -> AsyncIterator[Dict[str, Any]]:
-        """Yield the current snapshot, then stream subsequent updates.
+        """Yield the current snapshot, then a fresh snapshot after each change.
 
-        This creates a per-subscriber queue and cleans it up on exit.
+        Updates that land while the consumer is busy are coalesced into the
+        next snapshot it receives; none is missed, since a version counter
+        (not the notification itself) decides whether to wait. The repo's
+        condition is dropped when its last subscriber leaves.
 
         Args:
             repo_id: Repository identifier to observe.
 
         Yields:
-            dict: Initial snapshot, followed by incremental update payloads.
+            dict: Initial snapshot, followed by the latest snapshot after
+            each batch of updates.
         """
-        q: asyncio.Queue = asyncio.Queue(maxsize=100)
-        async with self._lock:
-            self._subs.setdefault(repo_id, set()).add(q)
-            yield await self.snapshot(repo_id)
+        cond = self._conds.get(repo_id)
+        if cond is None:
+            cond = self._conds[repo_id] = asyncio.Condition()
+        self._subscribers[repo_id] = self._subscribers.get(repo_id, 0) + 1
         try:
+            seen = self._versions.get(repo_id, 0)
+            yield await self.snapshot(repo_id)
             while True:
-                yield await q.get()
+                if self._versions.get(repo_id, 0) != seen:
+                    # Already changed, so nothing suspended; yield to the loop
+                    # anyway so a burst can't monopolize it.
+                    await asyncio.sleep(0)
+                else:
+                    async with cond:
+                        await cond.wait_for(lambda: self._versions.get(repo_id, 0) != seen)
+                seen = self._versions.get(repo_id, 0)
+                yield await self.snapshot(repo_id)
         finally:
-            async with self._lock:
-                self._subs.get(repo_id, set()).discard(q)
+            left = self._subscribers.get(repo_id, 1) - 1
+            if left > 0:
+                self._subscribers[repo_id] = left
+            else:
+                self._subscribers.pop(repo_id, None)
+                self._conds.pop(repo_id, None)
 
 BROKER: ProgressBroker = InMemoryProgressBroker()
 """Process-local singleton :class:`ProgressBroker` used by the application."""
\ No newline at end of file
@@ -1,5 +1,7 @@
 # app/services/retrieval.py
 
+import operator
+import threading
 from collections import defaultdict
 from typing import Dict, List, Optional, Tuple
 
@@ -16,7 +18,24 @@ except ImportError:
 from app.config import VOYAGE_EMBED_MODEL, RETRIEVAL_MIN_SCORE, VOYAGE_RERANK_MODEL
 from app.utils import get_document_store
 
+# Haystack Documents always carry these; one C-level call per document.
+_docgetter = operator.attrgetter("id", "meta", "content")
+
+_PIPELINE: Optional[Pipeline] = None
+_PIPELINE_LOCK = threading.Lock()
+
+
 def build_retrieval_pipeline() -> Pipeline:
+    """Process-wide retrieval pipeline, built (and warmed up) on first use."""
+    global _PIPELINE
+    if _PIPELINE is None:
+        with _PIPELINE_LOCK:
+            if _PIPELINE is None:
+                _PIPELINE = _build_retrieval_pipeline_impl()
+    return _PIPELINE
+
+
+def _build_retrieval_pipeline_impl() -> Pipeline:
     store = get_document_store()
     embedder = VoyageTextEmbedder(model=VOYAGE_EMBED_MODEL, input_type="query")
     try:
@@ -50,8 +69,11 @@ def run_retrieval(pipe: Pipeline, query: str, filters: Optional[Dict] = None) ->
 
     if ranked_docs:
         try:
-            scores = [getattr(d, "score", None) for d in ranked_docs]
-            top_score = next((s for s in scores if isinstance(s, (int, float))), 0.0)
+            # The ranker sorts best-first; usually ranked_docs[0] decides.
+            top_score = next(
+                (s for s in (getattr(d, "score", None) for d in ranked_docs) if isinstance(s, (int, float))),
+                0.0,
+            )
             if top_score < RETRIEVAL_MIN_SCORE:
                 ranked_docs = []
                 retrieved = []
@@ -59,41 +81,47 @@ def run_retrieval(pipe: Pipeline, query: str, filters: Optional[Dict] = None) ->
             pass
 
     contexts: List[Dict] = []
-    seen_files = set()
-    for d in retrieved:
-        meta = getattr(d, "meta", {}) or {}
-        fname = meta.get("filename") or meta.get("path") or "document"
-        if fname in seen_files:
-            continue
-        contexts.append({
-            "id": getattr(d, "id", None),
-            "filename": fname,
-            "content": getattr(d, "content", "") or "",
-            "start_line": meta.get("start_line"),
-            "end_line": meta.get("end_line"),
-        })
-        seen_files.add(fname)
-
-    warning = "" if retrieved else "Warning: no docs matched repo_id; answering without context.\n\n"
-
     grouped = defaultdict(list)
     file_order: List[str] = []
     for d in retrieved:
-        meta = getattr(d, "meta", {}) or {}
+        doc_id, meta, content = _docgetter(d)
+        meta = meta or {}
+        content = content or ""
         fname = meta.get("filename") or meta.get("path") or "document"
-        if fname not in file_order:
+        start_line = meta.get("start_line")
+        end_line = meta.get("end_line")
+        if fname not in grouped:
+            # First chunk of each file is its context entry.
             file_order.append(fname)
-        s = int(meta.get("start_line") or 1)
-        e = int(meta.get("end_line") or 1)
-        grouped[fname].append((s, e, getattr(d, "content", "") or ""))
+            contexts.append({
+                "id": doc_id,
+                "filename": fname,
+                "content": content,
+                "start_line": start_line,
+                "end_line": end_line,
+            })
+        grouped[fname].append((int(start_line or 1), int(end_line or 1), content))
+
+    warning = "" if retrieved else "Warning: no docs matched repo_id; answering without context.\n\n"
 
     grouped_files: List[Tuple[str, str]] = []
     for fname in file_order[:6]:
         spans = sorted(grouped[fname], key=lambda x: x[0])
-        blocks = [f"(lines {s}–{e})\n{c}" for s, e, c in spans if (c or "").strip()]
-        body = "\n\n---\n\n".join(blocks)
-        if len(body) > 2500:
-            body = body[:2500]
-        grouped_files.append((fname, body))
+        # Same as joining every block and cutting at 2500 chars, but stops
+        # building once the budget is spent.
+        remaining = 2500
+        parts: List[str] = []
+        for s, e, c in spans:
+            if not c.strip():
+                continue
+            piece = f"(lines {s}–{e})\n{c}"
+            if parts:
+                piece = "\n\n---\n\n" + piece
+            if len(piece) >= remaining:
+                parts.append(piece[:remaining])
+                break
+            parts.append(piece)
+            remaining -= len(piece)
+        grouped_files.append((fname, "".join(parts)))
 
     return retrieved, contexts, grouped_files, file_order, warning
@@ -20,6 +20,7 @@ Progress updates are sent with `_broadcast` and include phases like:
 
 import os
 import re
+import time
 import zipfile
 import asyncio
 import logging
@@ -38,8 +39,18 @@ logger = logging.getLogger(__name__)
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Bytes per read/write while receiving a ZIP, and minimum seconds between
+# upload progress events (the final size is always reported).
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_PROGRESS_INTERVAL = 0.25
+
+# Minimum seconds between git clone percent events; 0%, 100% and each
+# operation's start/end are always sent.
+GIT_PROGRESS_INTERVAL = 0.1
+
+# Used with fullmatch, so no ^/$ anchors.
 GITHUB_URL_RE = re.compile(
-    r'^(https?://)?(www\.)?github\.com/[\w\-_]+/[\w\-_]+(\.git)?/?$',
+    r'(https?://)?(www\.)?github\.com/[\w\-_]+/[\w\-_]+(\.git)?/?',
     re.IGNORECASE,
 )
 
@@ -67,6 +78,7 @@ class GitCloneProgress(RemoteProgress):
         super().__init__()
         self.repo_id = repo_id
         self._last_pct = -1
+        self._last_emit = 0.0
 
     def update(self, op_code, cur_count, max_count=None, message=""):
         op_key = op_code & self.OP_MASK
@@ -77,8 +89,12 @@ class GitCloneProgress(RemoteProgress):
 
         if max_count:
             pct = int(cur_count / max_count * 100) if max_count else None
-            if pct is not None and pct != self._last_pct:
+            now = time.monotonic()
+            if pct is not None and pct != self._last_pct and (
+                pct in (0, 100) or now - self._last_emit >= GIT_PROGRESS_INTERVAL
+            ):
                 self._last_pct = pct
+                self._last_emit = now
                 _emit_phase(self.repo_id, "upload", status="running", progress=pct, message=f"{op_name} ({pct}%)", kind="github")
         else:
             if message:
@@ -91,7 +107,7 @@ class GitCloneProgress(RemoteProgress):
 async def handle_github_clone(repo_url: str, repo_id: str, *, owner_user_id: Optional[str] = None) -> None:
     """Clone a public GitHub repository and start indexing it."""
     ru = (repo_url or "").strip()
-    if not GITHUB_URL_RE.match(ru):
+    if "github.com/" not in ru.lower() or not GITHUB_URL_RE.fullmatch(ru):
         _emit_phase(repo_id, "upload", status="error", message="Invalid GitHub URL. Expected format https://github.com/user/repo")
         return
 
@@ -145,6 +161,22 @@ async def handle_github_clone(repo_url: str, repo_id: str, *, owner_user_id: Opt
 
 
 
+def _extract_zip(zip_path: str, dest: str) -> None:
+    """Validate every member path against `dest`, then extract them in one pass.
+
+    The check is string-only: after normpath any ".." is leading, so a
+    member escapes `dest` only if it is absolute or starts with "..".
+    zipfile never creates symlinks, so nothing inside `dest` can redirect it.
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        infos = z.infolist()
+        for info in infos:
+            norm = os.path.normpath(info.filename)
+            if os.path.isabs(norm) or norm == ".." or norm.startswith(".." + os.sep):
+                raise ValueError(f"Unsafe path in ZIP: {info.filename}")
+        z.extractall(dest, members=infos)
+
+
 async def _process_zip_path(zip_path: str, *, repo_id: str, owner_user_id: Optional[str]) -> None:
     """
     Common ZIP processing: upsert repo (upload type), extract safely, index, mark indexed.
@@ -186,14 +218,8 @@ async def _process_zip_path(zip_path: str, *, repo_id: str, owner_user_id: Optio
     )
     _emit_phase(repo_id, "upload", status="running", message="Extracting ZIP", kind="zip")
 
-    dest_real = os.path.realpath(dest)
     try:
-        with zipfile.ZipFile(zip_path) as z:
-            for info in z.infolist():
-                extract_to = os.path.realpath(os.path.join(dest, info.filename))
-                if not extract_to.startswith(dest_real + os.sep) and extract_to != dest_real:
-                    raise ValueError(f"Unsafe path in ZIP: {info.filename}")
-                z.extract(info, dest)
+        await asyncio.to_thread(_extract_zip, zip_path, dest)
     except Exception as e:
         logger.exception("ZIP extraction failed: %s", e)
         _emit_phase(repo_id, "upload", status="error", message=f"ZIP extraction failed: {e}")
@@ -252,31 +278,37 @@ async def handle_zip_upload(file: UploadFile, repo_id: str, *, owner_user_id: Op
         bytes_written=0,
     )
 
+    def _emit_written() -> None:
+        pct = None
+        if bytes_total and bytes_total > 0:
+            pct = int(written * 100 / bytes_total)
+        _emit_phase(
+            repo_id,
+            "upload",
+            status="running",
+            progress=pct,
+            message=f"Uploading ZIP ({written // 1024} KB)",
+            kind="zip",
+            bytes_total=bytes_total,
+            bytes_written=written,
+        )
+
     written = 0
-    chunk_size = 1024 * 1024
+    last_emit = time.monotonic()
     try:
         async with aiofiles.open(tmp_path, "wb") as out_f:
             while True:
-                chunk = await file.read(chunk_size)
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
                 if not chunk:
                     break
                 await out_f.write(chunk)
                 written += len(chunk)
 
-                pct = None
-                if bytes_total and bytes_total > 0:
-                    pct = int(written * 100 / bytes_total)
-
-                _emit_phase(
-                    repo_id,
-                    "upload",
-                    status="running",
-                    progress=pct,
-                    message=f"Uploading ZIP ({written // 1024} KB)",
-                    kind="zip",
-                    bytes_total=bytes_total,
-                    bytes_written=written,
-                )
+                now = time.monotonic()
+                if now - last_emit >= UPLOAD_PROGRESS_INTERVAL:
+                    last_emit = now
+                    _emit_written()
+        _emit_written()
 
         try:
             os.replace(tmp_path, zip_path)
@@ -1,7 +1,10 @@
 # app/utils.py
 
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 from haystack.utils import Secret
 from haystack import Document
@@ -12,7 +15,7 @@ from haystack_integrations.components.embedders.voyage_embedders import (
 )
 
 from app.chunking import chunk_code
-from app.services.file_utils import list_files
+from app.services.file_utils import list_files_with_stat, normalize_newlines
 from app.config import (
     DATABASE_DSN,            
     UPLOAD_DIR,            
@@ -25,6 +28,9 @@ UPLOADS = Path(UPLOAD_DIR).resolve()
 EMBEDDINGS_TABLE = EMBEDDINGS_INDEX
 DEFAULT_EMBED_DIM = 1536
 
+# Threads reading and chunking files in load_code_chunks.
+LOAD_WORKERS = 8
+
 def get_document_store(
     recreate: bool = False,
     embedding_dimension: Optional[int] = None,
@@ -33,8 +39,21 @@ def get_document_store(
     Return a PgvectorDocumentStore consistent with the one used in indexing.py.
     NOTE: indexing.py lazily creates the table when it knows the model's true dim.
     Here, fallback is to DEFAULT_EMBED_DIM if not provided.
+    Stores are shared per dimension; `recreate=True` always builds a fresh one.
     """
     dim = embedding_dimension or DEFAULT_EMBED_DIM
+    if recreate:
+        _cached_document_store.cache_clear()
+        return _build_document_store(dim, recreate=True)
+    return _cached_document_store(dim)
+
+
+@lru_cache(maxsize=4)
+def _cached_document_store(dim: int) -> PgvectorDocumentStore:
+    return _build_document_store(dim, recreate=False)
+
+
+def _build_document_store(dim: int, recreate: bool) -> PgvectorDocumentStore:
     return PgvectorDocumentStore(
         connection_string=Secret.from_token(DATABASE_DSN),
         table_name=EMBEDDINGS_TABLE,
@@ -49,9 +68,29 @@ def get_document_store(
     )
 
 
-def _skip_hidden(rel_path: str) -> bool:
-    parts = rel_path.replace("\\", "/").split("/")
-    return any(p.startswith(".") for p in parts if p)
+def _read_source(abs_path: str) -> Optional[str]:
+    """UTF-8 text of a file (newlines normalized like `read_text`), or None.
+
+    A NUL byte in the first 4 KiB marks the file as binary, so images,
+    archives and bytecode are rejected without reading them in full.
+    """
+    try:
+        with open(abs_path, "rb") as f:
+            head = f.read(4096)
+            if b"\x00" in head:
+                return None
+            text = (head + f.read()).decode("utf-8")
+    except Exception:
+        return None
+    return normalize_newlines(text)
+
+
+def _read_and_chunk(item: Tuple[str, str]) -> Tuple[str, List[Dict[str, Any]]]:
+    rel_path, abs_path = item
+    text = _read_source(abs_path)
+    if text is None:
+        return rel_path, []
+    return rel_path, chunk_code(rel_path, text)
 
 
 def load_code_chunks(repo_id: str) -> List[Document]:
@@ -59,39 +98,41 @@ def load_code_chunks(repo_id: str) -> List[Document]:
     if not repo_path.is_dir():
         return []
 
-    docs: List[Document] = []
-    for rel_path in list_files(repo_id):
-        if _skip_hidden(rel_path):
-            continue
-
-        abs_path = (repo_path / rel_path).resolve()
-        try:
-            if not str(abs_path).startswith(str(repo_path)) or not abs_path.is_file():
+    # The walk never enters hidden directories and never follows directory
+    # symlinks, so regular files are already inside the repo; only symlinked
+    # files need their target checked, with a plain string prefix test.
+    repo_prefix = str(repo_path) + os.sep
+    paths: List[Tuple[str, str]] = []
+    for rel_path, abs_path, is_symlink, _ in list_files_with_stat(str(repo_path)):
+        if is_symlink:
+            try:
+                abs_path = os.path.realpath(abs_path)
+            except Exception:
                 continue
-        except Exception:
-            continue
-
-        try:
-            text = abs_path.read_text(encoding="utf-8")
-        except Exception:
-            continue
-
-        for idx, ch in enumerate(chunk_code(rel_path, text)):
-            content = (ch.get("content") or "").strip()
-            if not content:
+            if not abs_path.startswith(repo_prefix) or not os.path.isfile(abs_path):
                 continue
-            docs.append(
-                Document(
-                    content=content,
-                    meta={
-                        "repo_id": repo_id,
-                        "filename": rel_path,
-                        "chunk_index": idx,
-                        "start_line": ch.get("start_line"),
-                        "end_line": ch.get("end_line"),
-                    },
+        paths.append((rel_path, abs_path))
+
+    docs: List[Document] = []
+    # Reads and chunking overlap across threads; Documents are built here, in order.
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as ex:
+        for rel_path, chunks in ex.map(_read_and_chunk, paths):
+            for idx, ch in enumerate(chunks):
+                content = (ch.get("content") or "").strip()
+                if not content:
+                    continue
+                docs.append(
+                    Document(
+                        content=content,
+                        meta={
+                            "repo_id": repo_id,
+                            "filename": rel_path,
+                            "chunk_index": idx,
+                            "start_line": ch.get("start_line"),
+                            "end_line": ch.get("end_line"),
+                        },
+                    )
                 )
-            )
     return docs
 
 
@@ -105,6 +146,7 @@ def index_repo(repo_id: str, *, batch_size: int = 16, max_chars: int = 10000, ov
     return {"status": "started", "repo_id": repo_id}
 
 
+@lru_cache(maxsize=1)
 def get_query_embedder() -> VoyageTextEmbedder:
     return VoyageTextEmbedder(
         model=VOYAGE_EMBED_MODEL,
@@ -9,10 +9,67 @@ Usage:
     python run.py 
 
 It loads the `app` instance from `app.main` and serves it on
-`http://0.0.0.0:3001`.
+`http://0.0.0.0:3001`, using the uvloop event loop and the httptools
+HTTP parser (both shipped with `uvicorn[standard]`) when available.
+
+Set `WEB_CONCURRENCY` to run several worker processes (default: 1).
+Indexing progress and a few lookup caches live in process memory, so
+with more than one worker a status poll may land on a process that did
+not run the indexing job; raise it only behind sticky routing or for
+read-heavy deployments. Each worker opens its own database pool of up
+to `DB_POOL_MAX_SIZE` connections.
+
+Idle keep-alive connections are held for 30 s so clients polling status
+reuse their socket. Response compression is not done here: Uvicorn does
+not gzip, so `app.main` installs `GZipMiddleware` instead.
+
+With `BYTESOPHOS_ENV=prod` the per-request access log is turned off;
+startup and error logs are kept.
 """
 
+import importlib
+import os
+import sys
+
 import uvicorn
 
+try:
+    import uvloop  # noqa: F401
+    LOOP = "uvloop"
+except ImportError:  # e.g. Windows, where uvloop is unsupported
+    LOOP = "asyncio"
+
+try:
+    import httptools  # noqa: F401
+    HTTP = "httptools"
+except ImportError:
+    HTTP = "h11"
+
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+ACCESS_LOG = os.getenv("BYTESOPHOS_ENV") != "prod"
+APP_IMPORT = "app.main:app"
+
+
+def cached_import(module_path: str, attr: str):
+    """Return `attr` from `module_path`, reusing the module if already imported."""
+    module = sys.modules.get(module_path) or importlib.import_module(module_path)
+    return getattr(module, attr)
+
+
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=3001)
+    # A single process can be handed the app object directly; worker
+    # processes need the import string so each one imports the app itself.
+    target = cached_import(*APP_IMPORT.split(":")) if WORKERS == 1 else APP_IMPORT
+    uvicorn.run(
+        target,
+        host="0.0.0.0",
+        port=3001,
+        workers=WORKERS,
+        loop=LOOP,
+        http=HTTP,
+        interface="asgi3",
+        timeout_keep_alive=30,
+        h11_max_incomplete_event_size=16 * 1024,
+        limit_concurrency=1000,
+        access_log=ACCESS_LOG,
+    )
@@ -0,0 +1,39 @@
+# tests/test_newlines.py
+
+import pytest
+
+from app.services.file_utils import normalize_newlines
+
+CRLF_SOURCE = b"def f():\r\n    return 1\r\n\r\nx = 2\rprint(x)\r\n"
+LF_SOURCE = "def f():\n    return 1\n\nx = 2\nprint(x)\n"
+
+
+def test_normalize_newlines_translates_crlf_and_cr():
+    assert normalize_newlines(CRLF_SOURCE.decode("utf-8")) == LF_SOURCE
+
+
+def test_normalize_newlines_leaves_lf_text_alone():
+    assert normalize_newlines(LF_SOURCE) is LF_SOURCE
+
+
+@pytest.mark.parametrize("mmap_min_bytes", [1 << 20, 0])
+def test_read_text_normalizes_crlf(tmp_path, monkeypatch, mmap_min_bytes):
+    indexing = pytest.importorskip("app.services.indexing")
+    monkeypatch.setattr(indexing, "MMAP_MIN_BYTES", mmap_min_bytes)
+    path = tmp_path / "crlf.py"
+    path.write_bytes(CRLF_SOURCE)
+
+    text, digest = indexing._read_text(str(path))
+
+    assert text == LF_SOURCE
+    # The hash still covers the raw bytes, so a CRLF -> LF rewrite is a change.
+    assert digest == indexing._sha1(CRLF_SOURCE)
+
+
+def test_read_text_matches_load_code_chunks_reader(tmp_path):
+    indexing = pytest.importorskip("app.services.indexing")
+    utils = pytest.importorskip("app.utils")
+    path = tmp_path / "crlf.py"
+    path.write_bytes(CRLF_SOURCE)
+
+    assert indexing._read_text(str(path))[0] == utils._read_source(str(path))
@@ -0,0 +1,3 @@
+/* case-insensitive email lookups for /auth/signup and /auth/login */
+CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users(lower(email));
+
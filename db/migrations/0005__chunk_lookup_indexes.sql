@@ -0,0 +1,2 @@
+/* resolve_chunk_id lookups on document_chunks (by document + position) */
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document_index ON document_chunks(document_id, chunk_index);
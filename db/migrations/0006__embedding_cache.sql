@@ -0,0 +1,8 @@
+/* content-addressed embeddings, reused when re-indexing unchanged chunks */
+CREATE TABLE IF NOT EXISTS embedding_cache(
+  model text NOT NULL,
+  chunk_hash text NOT NULL,
+  embedding vector NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (model, chunk_hash)
+);
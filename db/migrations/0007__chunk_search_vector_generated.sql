@@ -0,0 +1,9 @@
+/* search_vector is derived by Postgres from chunk_text ('simple' config: no stemming for code) */
+DROP INDEX IF EXISTS idx_document_chunks_search_vector;
+
+ALTER TABLE document_chunks DROP COLUMN IF EXISTS search_vector;
+
+ALTER TABLE document_chunks
+  ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', chunk_text)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_search_vector ON document_chunks USING GIN(search_vector);
@@ -0,0 +1,12 @@
+/* store the relational embedding copies as FP16 halfvec (pgvector >= 0.7) */
+ALTER EXTENSION vector UPDATE;
+
+DROP INDEX IF EXISTS idx_document_chunks_embedding;
+
+ALTER TABLE document_chunks
+  ALTER COLUMN embedding TYPE halfvec(1536) USING embedding::halfvec(1536);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding ON document_chunks USING ivfflat(embedding halfvec_l2_ops) WITH (lists = 100);
+
+ALTER TABLE embedding_cache
+  ALTER COLUMN embedding TYPE halfvec USING embedding::halfvec;
@@ -0,0 +1,8 @@
+/* per-repo listing of the Haystack pgvector table (filter on meta->>'repo_id', ORDER BY id) */
+DO $$
+BEGIN
+  IF to_regclass('embeddings') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS embeddings_repo_id_idx ON embeddings ((meta->>'repo_id'), id);
+  END IF;
+END
+$$;
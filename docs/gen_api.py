@@ -1,48 +1,86 @@
 # docs/gen_api.py
 
 from pathlib import Path
+import os
 import sys
 import importlib.util
 import mkdocs_gen_files
 
 PKG_DIR = Path("backend/pipeline/app")
 IMPORT_PREFIX = "backend.pipeline.app"
+PKG_DIR_STR = str(PKG_DIR) + os.sep
+PREFIX_DOT = IMPORT_PREFIX + "."
+
+PAGE_TEMPLATE = (
+    "# `{ip}`\n\n"
+    "::: {ip}\n"
+    "    options:\n"
+    "      members: true\n"
+    "      show_source: true\n"
+    "      show_if_no_docstring: true\n"
+    "      members_order: source\n"
+    "      filters:\n"
+    '        - "!^_"\n'
+)
 
 if "." not in sys.path:
     sys.path.insert(0, ".")
 
-def importable(dotted: str) -> bool:
-    return importlib.util.find_spec(dotted) is not None
+# Every .py file under an importable PKG_DIR is importable by construction,
+# so the package is checked once instead of probing each module.
+if importlib.util.find_spec(IMPORT_PREFIX) is None:
+    raise RuntimeError(f"{IMPORT_PREFIX} is not importable from {os.getcwd()}")
+
+def walk(root: str):
+    """Yield paths of non-`__init__` `.py` files under `root`, one scandir per directory.
+
+    Entries are sorted per directory, so paths come out in the same order as a
+    global sort of their components without materializing the whole tree.
+    """
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk(entry.path)
+        elif entry.name.endswith(".py") and entry.name != "__init__.py":
+            yield entry.path
+
+# Characters literate-nav would read as markdown at the start of a title.
+NAV_ESCAPE_CHARS = tuple("!#()*+-[\\]_`{}")
 
-nav = mkdocs_gen_files.Nav()
+def nav_title(name: str) -> str:
+    return "\\" + name if name.startswith(NAV_ESCAPE_CHARS) else name
 
-for path in sorted(PKG_DIR.rglob("*.py")):
-    if path.name == "__init__.py":
-        continue
+def summary_lines(rows):
+    """Yield literate-nav lines for `(parts, doc)` rows in walk order.
 
-    import_path = IMPORT_PREFIX + "." + path.with_suffix("").relative_to(PKG_DIR).as_posix().replace("/", ".")
-    if not importable(import_path):
-        continue
+    Rows arrive depth-first and sorted, so a section header is emitted
+    whenever a row's directory parts diverge from the previous row's.
+    """
+    prev: list[str] = []
+    for parts, doc in rows:
+        dirs = parts[:-1]
+        common = 0
+        while common < len(dirs) and common < len(prev) and dirs[common] == prev[common]:
+            common += 1
+        for level in range(common, len(dirs)):
+            yield "    " * level + "* " + nav_title(dirs[level]) + "\n"
+        yield "    " * len(dirs) + f"* [{nav_title(parts[-1])}]({doc})\n"
+        prev = dirs
 
-    doc_path = Path("reference", *path.relative_to(PKG_DIR).with_suffix(".md").parts)
-    nav_path = doc_path.with_suffix("").parts
+rows = []
+
+for raw in walk(str(PKG_DIR)):
+    parts = raw[len(PKG_DIR_STR):-3].split(os.sep)
+    import_path = PREFIX_DOT + ".".join(parts)
+    doc_path = Path("reference", *parts[:-1], parts[-1] + ".md")
 
     with mkdocs_gen_files.open(doc_path, "w") as f:
-        print(f"# `{import_path}`\n", file=f)
-        print(f"::: {import_path}", file=f)
-        print("    options:", file=f)
-        print("      members: true", file=f)
-        print("      show_source: true", file=f)
-        print("      show_if_no_docstring: true", file=f)
-        print("      members_order: source", file=f)
-        print('      filters:', file=f)
-        print('        - \"!^_\"', file=f)
-
-    mkdocs_gen_files.set_edit_path(doc_path, path)
-
-    nav[nav_path[1:]] = doc_path
-
-lines = list(nav.build_literate_nav())
-relative = [line.replace("](reference/", "](") for line in lines]
+        f.write(PAGE_TEMPLATE.format(ip=import_path))
+
+    mkdocs_gen_files.set_edit_path(doc_path, raw)
+
+    rows.append((parts, "/".join(parts) + ".md"))
+
 with mkdocs_gen_files.open("reference/SUMMARY.md", "w") as f:
-    f.writelines(relative)
\ No newline at end of file
+    f.writelines(summary_lines(rows))
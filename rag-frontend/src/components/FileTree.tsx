@@ -113,17 +113,24 @@ export function FileTree({
     ws.onmessage = (ev) => {
       try {
         const msg = JSON.parse(ev.data);
-        if (msg?.event === "file_indexed" && typeof msg.path === "string") {
-          setAllPaths((prev) => {
-            if (prev.includes(msg.path)) return prev;
-            const ancestors = ancestorsOf(msg.path);
-            setExpandedKeys((keys) =>
-              Array.from(new Set([...keys, ...ancestors]))
-            );
-            addNewPath(msg.path);
-            return [...prev, msg.path].sort();
-          });
-        }
+        if (msg?.event !== "file_indexed") return;
+        const incoming: string[] = Array.isArray(msg.files)
+          ? msg.files.filter((p: unknown) => typeof p === "string")
+          : typeof msg.path === "string"
+          ? [msg.path]
+          : [];
+        if (!incoming.length) return;
+        setAllPaths((prev) => {
+          const seen = new Set(prev);
+          const added = incoming.filter((p) => !seen.has(p));
+          if (!added.length) return prev;
+          const ancestors = added.flatMap(ancestorsOf);
+          setExpandedKeys((keys) =>
+            Array.from(new Set([...keys, ...ancestors]))
+          );
+          added.forEach(addNewPath);
+          return [...prev, ...added].sort();
+        });
       } catch {}
     };
 